@@ -16,7 +16,7 @@ try:
     db = mongo_client["spam-detection"]
     logger.info("✓ MongoDB connected")
 except Exception as e:
-    logger.error(f"✗ MongoDB failed: {e}")
+    logger.error("✗ MongoDB failed: %s", e)
     db = None
 
 try:
@@ -24,7 +24,7 @@ try:
     redis_client.ping()
     logger.info("✓ Redis connected")
 except Exception as e:
-    logger.error(f"✗ Redis failed: {e}")
+    logger.error("✗ Redis failed: %s", e)
     redis_client = None
 
 def get_db():
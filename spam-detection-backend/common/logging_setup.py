@@ -0,0 +1,219 @@
+"""
+Non-blocking structured logging shared by both services
+- Request threads only enqueue records; a listener thread formats and writes
+- Messages stay lazy (%-style args) until the listener formats them
+- JSON records (LOG_FORMAT=json, default) or the plain basicConfig layout
+- Per-logger rate limits and sampling for high-volume INFO/DEBUG events
+"""
+import os
+import sys
+import json
+import queue
+import random
+import atexit
+import logging
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timezone
+
+# ===== LOGGING CONFIGURATION =====
+# LOG_RATE_LIMITS="common.messaging=50,spam_detection_service.app=200"  (records/second)
+# LOG_SAMPLE_RATES="common.repositories=0.1"                             (fraction kept)
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_RATE_LIMITS = os.getenv("LOG_RATE_LIMITS", "")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+# Opt-in: skip the caller frame lookup for every record, process-wide. Drops
+# pathname/lineno/funcName, which the default formats do not print anyway.
+LOG_SKIP_CALLER_INFO = os.getenv("LOG_SKIP_CALLER_INFO", "false").lower() in ("1", "true", "yes")
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+_handler = None
+
+
+def _parse_mapping(value):
+    mapping = {}
+    for item in value.split(","):
+        name, _, number = item.strip().partition("=")
+        if name and number:
+            mapping[name] = float(number)
+    return mapping
+
+
+def _lookup(mapping, logger_name):
+    """Most specific configured prefix of a dotted logger name"""
+    name = logger_name
+    while name:
+        if name in mapping:
+            return mapping[name]
+        name = name.rpartition(".")[0]
+    return None
+
+
+# ===== FORMATTERS =====
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields are kept as top-level keys"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+# ===== FILTERS =====
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per logger (burst = one second of traffic) plus random
+    sampling. Only records below WARNING are ever suppressed.
+    """
+
+    def __init__(self, rate_limits=None, sample_rates=None):
+        super().__init__()
+        self.rate_limits = rate_limits or {}
+        self.sample_rates = sample_rates or {}
+        self.suppressed = {}
+        self._buckets = {}  # logger name -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        sample_rate = _lookup(self.sample_rates, record.name)
+        if sample_rate is not None and random.random() >= sample_rate:
+            return self._suppress(record.name)
+
+        rate = _lookup(self.rate_limits, record.name)
+        if rate is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(record.name, [rate, now])
+            bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+        return self._suppress(record.name)
+
+    def _suppress(self, name):
+        with self._lock:
+            self.suppressed[name] = self.suppressed.get(name, 0) + 1
+        return False
+
+
+# ===== QUEUE HANDLER =====
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Enqueue the record untouched; when the queue is full, drop it instead of
+    blocking the request. Formatting happens on the listener thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record):
+        # QueueHandler.prepare() would format here, on the caller's thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(stream=None, level=LOG_LEVEL, fmt=LOG_FORMAT,
+                  rate_limits=None, sample_rates=None, queue_size=LOG_QUEUE_SIZE):
+    """
+    Route the root logger through a NonBlockingQueueHandler. Replaces any
+    handlers installed by basicConfig. Safe to call more than once.
+    """
+    global _listener, _handler
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    _handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    _handler.addFilter(RateLimitFilter(
+        _parse_mapping(LOG_RATE_LIMITS) if rate_limits is None else rate_limits,
+        _parse_mapping(LOG_SAMPLE_RATES) if sample_rates is None else sample_rates,
+    ))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(level)
+
+    # Records are built on the request thread: skip lookups the formatters never
+    # print (see "Optimization" in the logging HOWTO)
+    if LOG_SKIP_CALLER_INFO:
+        logging._srcfile = None
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+    # Uncaught exceptions in threads go through logging too, not raw stderr
+    threading.excepthook = lambda args: logging.getLogger("threading").error(
+        f"Uncaught exception in thread {args.thread.name if args.thread else '?'}",
+        exc_info=(args.exc_type, args.exc_value, args.exc_traceback))
+    return _handler
+
+
+def stop_logging():
+    """Flush pending records and detach the queue handler"""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+
+def get_logging_stats():
+    if _handler is None:
+        return {"enabled": False}
+    suppressed = {}
+    for log_filter in _handler.filters:
+        suppressed.update(getattr(log_filter, "suppressed", {}))
+    return {
+        "enabled": True,
+        "enqueued": _handler.enqueued,
+        "dropped": _handler.dropped,
+        "queued": _handler.queue.qsize(),
+        "suppressed": suppressed,
+    }
+
+
+atexit.register(stop_logging)
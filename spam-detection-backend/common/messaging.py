@@ -14,10 +14,10 @@ class RedisMessaging:
         try:
             message = json.dumps(payload)
             redis.publish(REDIS_CHANNEL, message)
-            logger.info(f"✓ Published: {payload}")
+            logger.info("✓ Published: %s", payload.get("classification"), extra={"submission_id": payload.get("submission_id")})
             return True
         except Exception as e:
-            logger.error(f"✗ Error: {e}")
+            logger.error("✗ Error: %s", e)
             return False
 
     @staticmethod
@@ -28,10 +28,10 @@ class RedisMessaging:
         try:
             pubsub = redis.pubsub()
             pubsub.subscribe(REDIS_CHANNEL)
-            logger.info(f"✓ Subscribed to {REDIS_CHANNEL}")
+            logger.info("✓ Subscribed to %s", REDIS_CHANNEL)
             return pubsub
         except Exception as e:
-            logger.error(f"✗ Error: {e}")
+            logger.error("✗ Error: %s", e)
             return None
 
     @staticmethod
@@ -45,7 +45,7 @@ class RedisMessaging:
                 continue
             try:
                 payload = json.loads(message["data"])
-                logger.info(f"Message received: {payload}")
+                logger.info("Message received: %s", payload.get("classification"))
                 callback(payload)
             except Exception as e:
-                logger.error(f"✗ Error: {e}")
+                logger.error("✗ Error: %s", e)
@@ -1,30 +1,77 @@
+import os
+import zlib
+import hashlib
 from datetime import datetime
-from bson import ObjectId
+from bson import ObjectId, Binary
+from pymongo import ReturnDocument
 from .db import get_db
 import logging
 
 logger = logging.getLogger(__name__)
 
+# "full": one document per submission with the whole email_text (original schema)
+# "hashed": one document per distinct body, keyed by content_hash, with a seen_count
+SUBMISSION_STORAGE_MODE = os.getenv("SUBMISSION_STORAGE_MODE", "full")
+# What to keep of the body in hashed mode: "none", "truncate" or "compress"
+SUBMISSION_BODY_MODE = os.getenv("SUBMISSION_BODY_MODE", "truncate")
+SUBMISSION_PREVIEW_CHARS = int(os.getenv("SUBMISSION_PREVIEW_CHARS", 256))
+
+def content_hash(email_text: str) -> str:
+    return hashlib.sha256(email_text.encode("utf-8", errors="replace")).hexdigest()
+
+def hashed_submission_fields(email_text: str, body_mode: str = SUBMISSION_BODY_MODE) -> dict:
+    """Fields written once, when a body is first seen"""
+    fields = {"length": len(email_text)}
+    if body_mode == "truncate":
+        fields["email_preview"] = email_text[:SUBMISSION_PREVIEW_CHARS]
+    elif body_mode == "compress":
+        fields["email_body_z"] = Binary(zlib.compress(email_text.encode("utf-8", errors="replace"), 6))
+    return fields
+
+def submission_body(doc: dict) -> str:
+    """Recover email text from any submission schema (None if not stored)"""
+    if doc.get("email_text") is not None:
+        return doc["email_text"]
+    if doc.get("email_body_z") is not None:
+        return zlib.decompress(doc["email_body_z"]).decode("utf-8")
+    return doc.get("email_preview")
+
 class SubmissionRepository:
     @staticmethod
     def insert_submission(email_text: str) -> str:
         db = get_db()
-        if not db:
+        if db is None:
             return None
         try:
-            doc = {"email_text": email_text, "submitted_at": datetime.utcnow()}
+            now = datetime.utcnow()
+            if SUBMISSION_STORAGE_MODE == "hashed":
+                # Repeated bodies become a counter increment on one document
+                doc = db.spam_submissions.find_one_and_update(
+                    {"content_hash": content_hash(email_text)},
+                    {
+                        "$inc": {"seen_count": 1},
+                        "$set": {"last_submitted_at": now},
+                        "$setOnInsert": dict(hashed_submission_fields(email_text), submitted_at=now),
+                    },
+                    projection={"_id": 1},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+                logger.info("✓ Submission saved: %s", doc["_id"])
+                return str(doc["_id"])
+            doc = {"email_text": email_text, "submitted_at": now}
             result = db.spam_submissions.insert_one(doc)
-            logger.info(f"✓ Submission saved: {result.inserted_id}")
+            logger.info("✓ Submission saved: %s", result.inserted_id)
             return str(result.inserted_id)
         except Exception as e:
-            logger.error(f"✗ Error: {e}")
+            logger.error("✗ Error: %s", e)
             return None
 
 class ClassificationRepository:
     @staticmethod
     def insert_classification(submission_id: str, classification: str, confidence: float) -> bool:
         db = get_db()
-        if not db:
+        if db is None:
             return False
         if classification not in ["spam", "ham"]:
             return False
@@ -36,17 +83,17 @@ class ClassificationRepository:
                 "created_at": datetime.utcnow()
             }
             db.classification_results.insert_one(doc)
-            logger.info(f"✓ Classification saved")
+            logger.info("✓ Classification saved")
             return True
         except Exception as e:
-            logger.error(f"✗ Error: {e}")
+            logger.error("✗ Error: %s", e)
             return False
 
 class DailyReportRepository:
     @staticmethod
     def update_daily_report(classification: str) -> dict:
         db = get_db()
-        if not db:
+        if db is None:
             return None
         try:
             today = datetime.utcnow().strftime("%Y-%m-%d")
@@ -73,16 +120,16 @@ class DailyReportRepository:
                 report["spam_percentage"] = 0.0
             report["updated_at"] = datetime.utcnow()
             db.daily_reports.replace_one({"date": today}, report, upsert=True)
-            logger.info(f"✓ Report updated: {report}")
+            logger.info("✓ Report updated: %s total, %s spam", report["total_checked"], report["spam_count"])
             return report
         except Exception as e:
-            logger.error(f"✗ Error: {e}")
+            logger.error("✗ Error: %s", e)
             return None
 
     @staticmethod
     def get_today_report() -> dict:
         db = get_db()
-        if not db:
+        if db is None:
             return None
         try:
             today = datetime.utcnow().strftime("%Y-%m-%d")
@@ -99,5 +146,5 @@ class DailyReportRepository:
                 del report["_id"]
             return report
         except Exception as e:
-            logger.error(f"✗ Error: {e}")
+            logger.error("✗ Error: %s", e)
             return None
@@ -3,25 +3,29 @@
 Reporting Service (Port 5001)
 - Subscribes to Redis for classification results
 - Updates daily reports in MongoDB
-- Provides report API endpoint
+- Provides report API endpoint (served from an in-memory snapshot)
+- Streams live report updates over Server-Sent Events
 """
 import os
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, Response
 from threading import Thread
 import logging
 import json
-import traceback
 
 # Add parent directory to path
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from common.logging_setup import setup_logging, get_logging_stats
+
 from common.repositories import DailyReportRepository
 from common.messaging import RedisMessaging
+from reporting_service.snapshot import report_snapshot
+from reporting_service.broadcaster import report_broadcaster, TooManyClients
 from datetime import datetime
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging (queue-based, JSON unless LOG_FORMAT=text)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
@@ -30,6 +34,12 @@ app = Flask(__name__)
 # Global variable to track listener status
 listener_started = False
 
+# Every snapshot change is fanned out to SSE clients
+report_snapshot.add_listener(report_broadcaster.publish)
+
+# Report responses may be reused briefly, then revalidated with If-None-Match
+REPORT_CACHE_CONTROL = f"private, max-age={int(os.getenv('REPORT_MAX_AGE', 2))}, must-revalidate"
+
 
 def start_listener():
     """
@@ -46,18 +56,18 @@ def start_listener():
                 logger.warning("Invalid payload: missing classification")
                 return
             
-            logger.info(f"Processing classification: {classification}")
+            logger.debug("Processing classification: %s", classification)
             
             # Update daily report
             report = DailyReportRepository.update_daily_report(classification)
             if report:
-                logger.info(f"Report updated: {report}")
+                report_snapshot.apply(report)
+                logger.info("Report updated: %s total, %s spam", report["total_checked"], report["spam_count"])
             else:
                 logger.error("Failed to update report")
         
         except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            logger.error(traceback.format_exc())
+            logger.exception("Error processing message: %s", e)
     
     # Start listening
     logger.info("Starting Redis listener...")
@@ -77,6 +87,24 @@ def start_background_listener():
     listener_started = True
     logger.info("✓ Background listener started")
 
+    report_snapshot.start_reconciler()
+    logger.info("✓ Report snapshot reconciler started")
+
+
+def snapshot_response(name, build):
+    """Serve a rendered snapshot view with ETag / 304 support"""
+    if not report_snapshot.is_loaded():
+        # Cold start only: the reconciler has not completed its first pass yet
+        report_snapshot.reconcile()
+    body, etag = report_snapshot.render(name, build)
+    if body is None:
+        return None
+
+    headers = {"ETag": f'"{etag}"', "Cache-Control": REPORT_CACHE_CONTROL}
+    if etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+    return Response(body, status=200, mimetype="application/json", headers=headers)
+
 
 @app.before_request
 def before_first_request():
@@ -93,6 +121,8 @@ def health():
         "status": "healthy",
         "service": "reporting",
         "listener_active": listener_started,
+        "stream_clients": report_broadcaster.clients,
+        "logging": get_logging_stats(),
         "timestamp": datetime.utcnow().isoformat()
     }), 200
 
@@ -104,32 +134,55 @@ def get_daily_report():
     Returns: {"date": "2025-12-05", "total_checked": 10, "spam_count": 7, ...}
     """
     try:
-        report = DailyReportRepository.get_today_report()
+        response = snapshot_response("daily", lambda report: report)
         
-        if not report:
+        if response is None:
             logger.error("Failed to fetch report")
             return jsonify({"error": "Failed to fetch report"}), 500
         
-        logger.info(f"Returning report: {report}")
-        return jsonify(report), 200
+        return response
     
     except Exception as e:
-        logger.error(f"Error fetching report: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error fetching report: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route("/api/reports/stream", methods=["GET"])
+def stream_reports():
+    """
+    Live report updates as Server-Sent Events
+    Each event: {"version": 12, "report": {...}, "delta": {"total_checked": 1, ...}}
+    """
+    try:
+        if not report_snapshot.is_loaded():
+            report_snapshot.reconcile()
+        frames = report_broadcaster.stream(request.headers.get("Last-Event-ID"))
+    except TooManyClients:
+        return jsonify({"error": "Too many stream clients", "retry_after": 30}), 503
+    except Exception as e:
+        logger.error("Error opening report stream: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
+
+    return Response(frames, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
 @app.route("/api/reports/stats", methods=["GET"])
 def get_statistics():
     """Get basic statistics"""
     try:
-        report = DailyReportRepository.get_today_report()
-        return jsonify({
+        active = listener_started
+        response = snapshot_response(f"stats:{active}", lambda report: {
             "today_report": report,
-            "listener_active": listener_started
-        }), 200
+            "listener_active": active
+        })
+        if response is None:
+            return jsonify({"today_report": None, "listener_active": active}), 200
+        return response
     except Exception as e:
-        logger.error(f"Error: {e}")
+        logger.error("Error: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 
@@ -138,4 +191,4 @@ if __name__ == "__main__":
     start_background_listener()
     
     # Run Flask app
-    app.run(host="0.0.0.0", port=5001, debug=False)
+    app.run(host="0.0.0.0", port=5001, debug=False, threaded=True)
@@ -0,0 +1,183 @@
+# backend/reporting_service/broadcaster.py
+"""
+Server-Sent Events fan-out for live reports
+- One in-process broadcaster, fed by the report snapshot (no Redis
+  subscription per client)
+- Clients only ever hold a reference to the latest report; a slow client
+  skips intermediate versions and gets one coalesced delta when it catches up
+- Publishing never waits on clients, so a stuck socket cannot back it up
+- Publishes are coalesced: waiting clients are woken at most
+  SSE_MAX_EVENTS_PER_SECOND times a second, however many classifications
+  arrive, so wakeups scale with clients x that rate, not with volume
+
+Each connection is a blocked generator with no per-client queue. Under the
+threaded Werkzeug server (reporting_service/app.py) that is one OS thread
+per connection, which is why SSE_MAX_CLIENTS defaults to a few hundred.
+Holding thousands of idle connections needs a greenlet server, e.g.
+`pip install gunicorn gevent` and
+`gunicorn -k gevent -w 1 -b 0.0.0.0:5001 reporting_service.app:app`
+(one worker: the broadcaster and snapshot are per process); the gevent
+worker monkey-patches threading, so this module works unchanged.
+"""
+import json
+import logging
+import os
+import time
+from threading import Condition, Event, Lock, Thread
+
+from reporting_service.snapshot import json_default
+
+logger = logging.getLogger(__name__)
+
+SSE_MAX_CLIENTS = int(os.getenv("SSE_MAX_CLIENTS", 500))
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+SSE_MAX_EVENTS_PER_SECOND = float(os.getenv("SSE_MAX_EVENTS_PER_SECOND", 2))
+
+_DELTA_FIELDS = ("total_checked", "spam_count", "ham_count", "spam_percentage")
+
+
+def _delta(previous, current):
+    """Field-wise change since the version a client last saw"""
+    if previous is None or previous.get("date") != current.get("date"):
+        return None
+    return {field: round(current.get(field, 0) - previous.get(field, 0), 2)
+            for field in _DELTA_FIELDS}
+
+
+class TooManyClients(Exception):
+    pass
+
+
+class ReportBroadcaster:
+    """
+    Latest-value broadcaster: publish() is O(1) and wakes nobody; a flusher
+    thread turns the latest pending report into a new version (and one
+    notify_all) at most max_rate times a second
+    """
+
+    def __init__(self, max_clients=SSE_MAX_CLIENTS, heartbeat=SSE_HEARTBEAT_SECONDS,
+                 max_rate=SSE_MAX_EVENTS_PER_SECOND):
+        self.max_clients = max_clients
+        self.heartbeat = heartbeat
+        self.min_interval = 1.0 / max_rate
+        self._pending = None
+        self._pending_lock = Lock()
+        self._dirty = Event()
+        self._flusher = None
+        self._cond = Condition()
+        self._clients_lock = Lock()
+        self._version = 0
+        self._report = None
+        self._history = {}  # version -> report, only current and previous kept
+        self._rendered = {}  # (from_version, to_version) -> event text
+        self.clients = 0
+
+    def publish(self, report):
+        """Record the latest report; clients see it on the next flush"""
+        with self._pending_lock:
+            self._pending = report
+            if self._flusher is None:
+                self._flusher = Thread(target=self._flush_loop, name="sse-flusher", daemon=True)
+                self._flusher.start()
+        self._dirty.set()
+
+    def _flush_loop(self):
+        while True:
+            self._dirty.wait()
+            # Everything published during this pause collapses into one version
+            time.sleep(self.min_interval)
+            self._dirty.clear()
+            self.flush()
+
+    def flush(self):
+        """Make the pending report the current version and wake clients"""
+        with self._pending_lock:
+            report = self._pending
+        with self._cond:
+            if report is None or report is self._report:
+                return
+            self._history = {self._version: self._report} if self._report else {}
+            self._version += 1
+            self._report = report
+            self._history[self._version] = report
+            self._rendered = {}
+            self._cond.notify_all()
+
+    def _event(self, since, since_report):
+        """Render the event taking a client from `since` to the current version"""
+        key = (since, self._version)
+        event = self._rendered.get(key)
+        if event is None:
+            payload = {
+                "version": self._version,
+                "report": self._report,
+                "delta": _delta(since_report, self._report),
+            }
+            data = json.dumps(payload, default=json_default)
+            event = self._rendered[key] = f"id: {self._version}\nevent: report\ndata: {data}\n\n"
+        return event
+
+    def stream(self, last_event_id=None):
+        """
+        Iterable of SSE frames for one client. Raises TooManyClients up front
+        if the connection limit is reached; the slot is freed on close().
+        """
+        with self._clients_lock:
+            if self.clients >= self.max_clients:
+                raise TooManyClients()
+            self.clients += 1
+        return _ClientStream(self, self._stream(last_event_id))
+
+    def _release(self):
+        with self._clients_lock:
+            self.clients -= 1
+
+    def _stream(self, last_event_id):
+        seen = None
+        seen_report = None
+        try:
+            seen = int(last_event_id) if last_event_id else None
+        except ValueError:
+            pass
+        with self._cond:
+            if seen not in self._history:
+                seen = None  # unknown or stale id: start with a full report
+        yield f"retry: {self.heartbeat * 1000}\n\n"
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._report is not None and self._version != seen,
+                                    timeout=self.heartbeat)
+                if self._report is None or self._version == seen:
+                    frame = ": keep-alive\n\n"
+                else:
+                    if seen_report is None and seen is not None:
+                        seen_report = self._history.get(seen)
+                    frame = self._event(seen, seen_report)
+                    seen = self._version
+                    seen_report = self._report
+            # Written outside the lock: a slow socket only delays this client
+            yield frame
+
+
+class _ClientStream:
+    """Response iterable that gives the client slot back when the server closes it"""
+
+    def __init__(self, broadcaster, frames):
+        self._broadcaster = broadcaster
+        self._frames = frames
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._frames)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._frames.close()
+            self._broadcaster._release()
+
+
+report_broadcaster = ReportBroadcaster()
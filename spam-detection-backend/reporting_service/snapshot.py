@@ -0,0 +1,123 @@
+# backend/reporting_service/snapshot.py
+"""
+In-process snapshot of today's report
+- Updated by the Redis listener as results are applied
+- Reconciled with MongoDB periodically (other writers, day rollover)
+- Pre-renders response bodies + ETags so reads never touch the database
+- Notifies listeners (the SSE broadcaster) on every change
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from threading import Lock, Thread
+from werkzeug.http import http_date
+
+from common.repositories import DailyReportRepository
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL = int(os.getenv("REPORT_RECONCILE_SECONDS", 30))
+
+
+def empty_report(date):
+    return {
+        "date": date,
+        "total_checked": 0,
+        "spam_count": 0,
+        "ham_count": 0,
+        "spam_percentage": 0.0
+    }
+
+
+def json_default(value):
+    # Same date format as Flask's jsonify
+    if isinstance(value, datetime):
+        return http_date(value)
+    return str(value)
+
+
+class ReportSnapshot:
+    """Today's report plus rendered bodies, guarded by a lock"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._report = None
+        self._rendered = {}
+        self._listeners = []
+        self.version = 0
+        self.last_reconciled = None
+
+    def add_listener(self, callback):
+        """callback(report) runs on every snapshot change (keep it non-blocking)"""
+        self._listeners.append(callback)
+
+    def _set(self, report):
+        report = {k: v for k, v in report.items() if k != "_id"}
+        self._report = report
+        self._rendered = {}
+        self.version += 1
+        for callback in self._listeners:
+            callback(report)
+
+    def apply(self, report):
+        """Called by the listener with the report it just wrote"""
+        if not report:
+            return
+        with self._lock:
+            self._set(report)
+
+    def reconcile(self):
+        """Pull today's report from MongoDB; never moves counts backwards within a day"""
+        report = DailyReportRepository.get_today_report()
+        if report is None:
+            return False
+        with self._lock:
+            current = self._report
+            if current is None or current.get("date") != report.get("date") or \
+                    report.get("total_checked", 0) >= current.get("total_checked", 0):
+                if current != {k: v for k, v in report.items() if k != "_id"}:
+                    self._set(report)
+            self.last_reconciled = datetime.utcnow()
+        return True
+
+    def is_loaded(self):
+        return self._report is not None
+
+    def render(self, name, build):
+        """
+        Return (body, etag) for a view of the report. build(report) produces
+        the payload; the serialized body is cached until the next update.
+        """
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        with self._lock:
+            if self._report is None:
+                return None, None
+            if self._report.get("date") != today:
+                # Day rolled over before the next reconcile
+                self._set(empty_report(today))
+            cached = self._rendered.get(name)
+            if cached is None:
+                body = json.dumps(build(dict(self._report)), default=json_default)
+                etag = hashlib.sha1(body.encode()).hexdigest()[:20]
+                cached = self._rendered[name] = (body, etag)
+            return cached
+
+    def start_reconciler(self, interval=RECONCILE_INTERVAL):
+        """Background thread: reconcile now, then every `interval` seconds"""
+        def loop():
+            while True:
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.error("✗ Snapshot reconcile failed: %s", e)
+                time.sleep(interval)
+
+        thread = Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+
+report_snapshot = ReportSnapshot()
@@ -0,0 +1,145 @@
+"""
+Measure per-request logging overhead before/after the queue-based setup
+Run: python scripts/benchmark_logging.py [--requests 20000] [--threads 8]
+
+Each simulated request emits the log lines a prediction produces across
+app.py, messaging.py and repositories.py. "before" uses basicConfig with
+eager f-strings of full payloads/reports; "after" uses setup_logging()
+with lazy arguments, with and without sampling of the repository and
+messaging loggers. Output goes to a real file so I/O contention counts.
+Set LOG_SKIP_CALLER_INFO=1 to include the opt-in caller-lookup skip.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.logging_setup import setup_logging, stop_logging, get_logging_stats
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import argparse
+import tempfile
+import logging
+import time
+import json
+
+app_logger = logging.getLogger("spam_detection_service.app")
+messaging_logger = logging.getLogger("common.messaging")
+repository_logger = logging.getLogger("common.repositories")
+
+EMAIL_TEXT = "Congratulations! You have been selected to claim your prize. " * 30
+
+
+def make_payload(i):
+    return {"submission_id": f"{i:024x}", "classification": "spam" if i % 3 else "ham",
+            "confidence": 0.85, "email_text": EMAIL_TEXT, "user": "admin"}
+
+
+def make_report(i):
+    return {"date": "2026-01-01", "total_checked": i, "spam_count": i // 3 * 2, "ham_count": i // 3,
+            "spam_percentage": 66.67, "created_at": datetime.utcnow(), "updated_at": datetime.utcnow()}
+
+
+def request_before(i):
+    payload, report = make_payload(i), make_report(i)
+    repository_logger.info(f"✓ Submission saved: {payload['submission_id']}")
+    app_logger.info(f"User admin - Prediction: {payload['classification']} (confidence: 0.85)")
+    repository_logger.info(f"✓ Classification saved")
+    messaging_logger.info(f"✓ Published: {payload}")
+    messaging_logger.info(f"Message received: {payload}")
+    repository_logger.info(f"✓ Report updated: {report}")
+
+
+def request_after(i):
+    payload, report = make_payload(i), make_report(i)
+    repository_logger.info("✓ Submission saved: %s", payload["submission_id"])
+    app_logger.info("User %s - Prediction: %s (confidence: %s)", "admin", payload["classification"], 0.85)
+    repository_logger.info("✓ Classification saved")
+    messaging_logger.info("✓ Published: %s", payload["classification"],
+                          extra={"submission_id": payload["submission_id"]})
+    messaging_logger.info("Message received: %s", payload["classification"])
+    repository_logger.info("✓ Report updated: %s total, %s spam", report["total_checked"], report["spam_count"])
+
+
+def drive(emit, requests, threads):
+    def client(offset):
+        latencies = []
+        for i in range(offset, requests, threads):
+            started = time.perf_counter()
+            emit(i)
+            latencies.append((time.perf_counter() - started) * 1e6)
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        latencies = [latency for result in pool.map(client, range(threads)) for latency in result]
+    return latencies, time.perf_counter() - started
+
+
+def summarize(name, latencies, elapsed, drain=0.0, log_path=None):
+    summary = {
+        "scenario": name,
+        "per_request_p50_us": round(float(np.percentile(latencies, 50)), 1),
+        "per_request_p99_us": round(float(np.percentile(latencies, 99)), 1),
+        "per_request_mean_us": round(float(np.mean(latencies)), 1),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "drain_s": round(drain, 3),
+        "log_bytes": os.path.getsize(log_path) if log_path else None,
+    }
+    logging.getLogger(__name__).warning(json.dumps(summary))
+    return summary
+
+
+def run(requests, threads):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Floor: the simulated request with every record filtered out by level
+        logging.getLogger().setLevel(logging.WARNING)
+        floor = drive(request_after, requests, threads)
+
+        # Before: basicConfig-style synchronous handler, eager formatting
+        path = os.path.join(tmp, "before.log")
+        stream = open(path, "w")
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        latencies, elapsed = drive(request_before, requests, threads)
+        root.removeHandler(handler)
+        stream.close()
+        before = (latencies, elapsed, 0.0, path)
+
+        scenarios = [("after_queue_json", {}), ("after_queue_json_sampled",
+                     {"common.repositories": 0.1, "common.messaging": 0.1})]
+        after = []
+        for name, sample_rates in scenarios:
+            path = os.path.join(tmp, f"{name}.log")
+            stream = open(path, "w")
+            setup_logging(stream=stream, level="INFO", fmt="json", sample_rates=sample_rates,
+                          rate_limits={}, queue_size=requests * 6)
+            latencies, elapsed = drive(request_after, requests, threads)
+            stats = get_logging_stats()
+            started = time.perf_counter()
+            stop_logging()
+            drain = time.perf_counter() - started
+            stream.close()
+            after.append((name, (latencies, elapsed, drain, path), stats))
+
+        # Report on a plain stderr handler now that the benchmark handlers are gone
+        logging.basicConfig(level=logging.INFO)
+        results.append(summarize("no_logging_floor", *floor))
+        results.append(summarize("before_sync_fstring", *before))
+        for name, measurements, stats in after:
+            results.append(dict(summarize(name, *measurements), dropped=stats["dropped"],
+                                suppressed=sum(stats["suppressed"].values())))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Logging overhead benchmark")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    run(args.requests, args.threads)
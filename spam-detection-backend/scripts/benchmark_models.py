@@ -0,0 +1,229 @@
+"""
+Benchmark classifier variants on quality and serving cost
+Run: python scripts/benchmark_models.py [--model current=models/spam_nb.pkl] [--save]
+
+Every candidate shares the same TF-IDF features and train/test split as
+train.py. For each one we record precision/recall, single-item and batch
+latency, single-core throughput, pickle size, and load time / RSS growth /
+model heap (measured in a fresh process, after imports), then mark the Pareto-optimal
+candidates.
+Reports are written to reports/model_benchmark.{json,md}.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB, ComplementNB
+from sklearn.linear_model import SGDClassifier, LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import precision_score, recall_score
+from threadpoolctl import threadpool_limits
+import multiprocessing
+import pandas as pd
+import numpy as np
+import argparse
+import pickle
+import tempfile
+import time
+import json
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATA_PATH = "data/training_data.csv"
+REPORT_DIR = "reports"
+CANDIDATE_DIR = "models/candidates"
+
+CANDIDATES = {
+    "multinomial_nb": lambda: MultinomialNB(),
+    "complement_nb": lambda: ComplementNB(),
+    "sgd_linear": lambda: SGDClassifier(loss="modified_huber", alpha=1e-4, random_state=42),
+    "logreg_l1": lambda: LogisticRegression(penalty="l1", solver="liblinear", C=10.0),
+}
+
+SINGLE_ITERATIONS = 200
+BATCH_SIZE = 256
+BATCH_ROUNDS = 20
+
+# (metric, higher is better)
+PARETO_OBJECTIVES = (
+    ("precision", True),
+    ("recall", True),
+    ("p99_single_ms", False),
+    ("size_bytes", False),
+    ("model_heap_mb", False),
+)
+
+
+def _percentile(samples, q):
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+
+def _peak_rss():
+    """Peak RSS of this process in bytes, or None where resource is unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss_scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * rss_scale
+
+
+def _load_and_measure(path, texts):
+    """
+    Runs in a fresh process so load time and memory are not skewed by the parent.
+    The worker has already imported sklearn/numpy/pandas (this module), so the
+    RSS growth across load + predict is the model's, not the interpreter's.
+    """
+    import tracemalloc
+    rss_before = _peak_rss()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        model = pickle.load(f)
+    load_seconds = time.perf_counter() - started
+    model.predict(texts)
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    rss_after = _peak_rss()
+    rss_delta = rss_after - rss_before if rss_before is not None else None
+    return load_seconds, rss_delta, heap_peak
+
+
+def measure_serving_cost(model, texts, path, pool):
+    """Latency, throughput, size, load time and memory for one fitted pipeline"""
+    texts = list(texts)
+    batch = (texts * (BATCH_SIZE // max(len(texts), 1) + 1))[:BATCH_SIZE]
+
+    with threadpool_limits(limits=1):
+        model.predict(texts[:1])  # warm-up
+        single = []
+        for i in range(SINGLE_ITERATIONS):
+            text = texts[i % len(texts)]
+            started = time.perf_counter()
+            model.predict([text])
+            single.append((time.perf_counter() - started) * 1000)
+
+        batch_times = []
+        for _ in range(BATCH_ROUNDS):
+            started = time.perf_counter()
+            model.predict(batch)
+            batch_times.append(time.perf_counter() - started)
+
+    load_seconds, rss_delta, heap_peak = pool.apply(_load_and_measure, (path, batch))
+    batch_median = float(np.median(batch_times))
+    return {
+        "p50_single_ms": round(_percentile(single, 50), 3),
+        "p99_single_ms": round(_percentile(single, 99), 3),
+        "batch_item_us": round(batch_median / len(batch) * 1e6, 2),
+        "throughput_per_core": round(len(batch) / batch_median, 1),
+        "size_bytes": os.path.getsize(path),
+        "load_ms": round(load_seconds * 1000, 2),
+        "rss_delta_mb": round(rss_delta / 2 ** 20, 2) if rss_delta is not None else None,
+        "model_heap_mb": round(heap_peak / 2 ** 20, 3),
+    }
+
+
+def pareto_front(results):
+    """Names of candidates not dominated on every PARETO_OBJECTIVES metric"""
+    def value(result, metric, higher):
+        v = result.get(metric)
+        if v is None:
+            return 0.0
+        return v if higher else -v
+
+    front = []
+    for a in results:
+        dominated = False
+        for b in results:
+            if a is b:
+                continue
+            pairs = [(value(b, m, h), value(a, m, h)) for m, h in PARETO_OBJECTIVES]
+            if all(x >= y for x, y in pairs) and any(x > y for x, y in pairs):
+                dominated = True
+                break
+        if not dominated:
+            front.append(a["name"])
+    return front
+
+
+def write_report(results, front):
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    for result in results:
+        result["pareto"] = result["name"] in front
+    with open(os.path.join(REPORT_DIR, "model_benchmark.json"), "w") as f:
+        json.dump({"results": results, "pareto_front": front}, f, indent=2)
+
+    columns = ["name", "precision", "recall", "p50_single_ms", "p99_single_ms", "batch_item_us",
+               "throughput_per_core", "size_bytes", "load_ms", "rss_delta_mb", "model_heap_mb", "pareto"]
+    lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+    for result in sorted(results, key=lambda r: (not r["pareto"], r["p99_single_ms"])):
+        lines.append("| " + " | ".join(str(result.get(c)) for c in columns) + " |")
+    with open(os.path.join(REPORT_DIR, "model_benchmark.md"), "w") as f:
+        f.write("# Model benchmark\n\n" + "\n".join(lines) + "\n")
+    logger.info("\n" + "\n".join(lines))
+
+
+def run_benchmark(extra_models=None, save=False):
+    df = pd.read_csv(DATA_PATH)
+    X = df["text"].astype(str).tolist()
+    y = df["label"].values
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+    # Shared features: every trained candidate sees exactly the same matrix
+    vectorizer = TfidfVectorizer(max_features=1000, stop_words="english")
+    X_train_tfidf = vectorizer.fit_transform(X_train)
+
+    models = {}
+    for name, factory in CANDIDATES.items():
+        logger.info(f"Training {name}...")
+        clf = factory().fit(X_train_tfidf, y_train)
+        models[name] = Pipeline([("tfidf", vectorizer), ("clf", clf)])
+    for name, path in (extra_models or {}).items():
+        logger.info(f"Loading {name} from {path}")
+        with open(path, "rb") as f:
+            models[name] = pickle.load(f)
+
+    if save:
+        os.makedirs(CANDIDATE_DIR, exist_ok=True)
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp_dir, ctx.Pool(1, maxtasksperchild=1) as pool:
+        for name, model in models.items():
+            path = os.path.join(CANDIDATE_DIR if save and name in CANDIDATES else tmp_dir, f"{name}.pkl")
+            with open(path, "wb") as f:
+                pickle.dump(model, f)
+
+            y_pred = model.predict(X_test)
+            result = {
+                "name": name,
+                "precision": round(float(precision_score(y_test, y_pred, zero_division=0)), 4),
+                "recall": round(float(recall_score(y_test, y_pred, zero_division=0)), 4),
+            }
+            result.update(measure_serving_cost(model, X_test or X_train, path, pool))
+            if isinstance(model, Pipeline) and hasattr(model[-1], "coef_"):
+                result["nonzero_weights"] = int(np.count_nonzero(model[-1].coef_))
+            results.append(result)
+            logger.info(f"✓ {name}: {result}")
+
+    front = pareto_front(results)
+    write_report(results, front)
+    logger.info(f"Pareto front: {', '.join(front)}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark classifier variants")
+    parser.add_argument("--model", action="append", default=[], metavar="NAME=PATH",
+                        help="also benchmark an existing pickled pipeline")
+    parser.add_argument("--save", action="store_true",
+                        help=f"keep trained candidates in {CANDIDATE_DIR}/")
+    args = parser.parse_args()
+    extra = dict(item.split("=", 1) for item in args.model)
+    run_benchmark(extra, args.save)
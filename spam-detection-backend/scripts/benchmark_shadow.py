@@ -0,0 +1,174 @@
+"""
+Measure the hot-path cost of shadow scoring
+Run: python scripts/benchmark_shadow.py [--trials 6] [--seconds 5] [--load 0.5]
+
+Drives MLService.predict open-loop at a fixed rate (a fraction of the
+measured capacity, so the idle-priority worker really gets CPU and scores
+concurrently) and compares primary response-time percentiles with shadow
+mode off and on (--sample-rate, several candidates). Off/on trials
+are interleaved, alternating order, and the spread across trials is
+reported next to the difference. Candidates are trained on the fly like
+scripts/benchmark_models.py.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spam_detection_service.ml_service import MLService
+from spam_detection_service.shadow import ShadowScorer
+from benchmark_models import CANDIDATES, DATA_PATH
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import numpy as np
+import argparse
+import time
+import json
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def train_candidates():
+    df = pd.read_csv(DATA_PATH)
+    X = df["text"].astype(str).tolist()
+    y = df["label"].values
+    vectorizer = TfidfVectorizer(max_features=1000, stop_words="english")
+    X_tfidf = vectorizer.fit_transform(X)
+    candidates = {name: Pipeline([("tfidf", vectorizer), ("clf", factory().fit(X_tfidf, y))])
+                  for name, factory in CANDIDATES.items()}
+    return X, candidates
+
+
+def measure_capacity(service, texts, clients, seconds=1.0):
+    """Closed-loop requests/s with shadow off, used to pick a non-saturating rate"""
+    stop = time.perf_counter() + seconds
+    counts = []
+
+    def client(offset):
+        done = 0
+        while time.perf_counter() < stop:
+            service.predict(texts[(offset + done) % len(texts)])
+            done += 1
+        return done
+
+    with ThreadPoolExecutor(clients) as pool:
+        counts = list(pool.map(client, range(clients)))
+    return sum(counts) / seconds
+
+
+def drive(service, texts, rate, seconds, clients):
+    """
+    Open loop: send at a fixed rate for `seconds`, whatever the latency.
+    Returns response times (ms) measured from each request's scheduled send.
+    """
+    latencies = []
+    interval = 1.0 / rate
+
+    def send(i, due):
+        service.predict(texts[i % len(texts)])
+        latencies.append((time.perf_counter() - due) * 1000)
+
+    with ThreadPoolExecutor(clients) as pool:
+        start = time.perf_counter()
+        for i in range(int(rate * seconds)):
+            due = start + i * interval
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, i, due)
+    return latencies
+
+
+def scored_total(shadow):
+    """Samples scored by every candidate"""
+    models = shadow.get_status()["models"].values()
+    return min(model["scored"] + model["errors"] for model in models)
+
+
+def summarize(name, trials):
+    """Median and spread of per-trial p50/p99 across trials"""
+    p50s = [trial["p50_ms"] for trial in trials]
+    p99s = [trial["p99_ms"] for trial in trials]
+    summary = {
+        "scenario": name,
+        "trials": len(trials),
+        "p50_ms_median": round(float(np.median(p50s)), 3),
+        "p99_ms_median": round(float(np.median(p99s)), 3),
+        "p99_ms_min": round(min(p99s), 3),
+        "p99_ms_max": round(max(p99s), 3),
+    }
+    if "scored" in trials[0]:
+        summary.update(sampled=sum(t["sampled"] for t in trials), dropped=sum(t["dropped"] for t in trials),
+                       scored=sum(t["scored"] for t in trials))
+    logger.info(json.dumps(summary))
+    return summary
+
+
+def run(trials, seconds, load, sample_rate, clients, queue_size, workers):
+    service = MLService()
+    if not service.is_loaded():
+        logger.error("Primary model not loaded - run train.py first")
+        return None
+    texts, candidates = train_candidates()
+
+    service.shadow = None
+    measure_capacity(service, texts, clients, 0.5)  # warm-up
+    capacity = measure_capacity(service, texts, clients)
+    rate = capacity * load
+    logger.info(f"Capacity ~{capacity:.0f} req/s; offering {rate:.0f} req/s ({load:.0%}) for {seconds}s per trial")
+
+    shadow = ShadowScorer(service.model, candidates, sample_rate=sample_rate,
+                          queue_size=queue_size, workers=workers)
+    # Worker start-up (interpreter + model load) is a one-off cost; keep it out of the runs
+    shadow.start()
+    while shadow.workers_ready < workers:
+        time.sleep(0.1)
+
+    results = {"shadow_off": [], "shadow_on": []}
+    for trial in range(trials):
+        # Alternate the order so drift does not line up with one scenario
+        order = ["shadow_off", "shadow_on"] if trial % 2 == 0 else ["shadow_on", "shadow_off"]
+        for scenario in order:
+            service.shadow = shadow if scenario == "shadow_on" else None
+            before = shadow.get_status()
+            scored_before = scored_total(shadow)
+            latencies = drive(service, texts, rate, seconds, clients)
+            service.shadow = None
+            # Let the worker finish what was queued during this trial
+            drain_deadline = time.perf_counter() + 30
+            while scenario == "shadow_on" and shadow.get_status()["pending"] > 0 \
+                    and time.perf_counter() < drain_deadline:
+                time.sleep(0.05)
+            result = {
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+            }
+            if scenario == "shadow_on":
+                after = shadow.get_status()
+                result.update(sampled=after["sampled"] - before["sampled"],
+                              dropped=after["dropped"] - before["dropped"],
+                              scored=scored_total(shadow) - scored_before)
+            results[scenario].append(result)
+    shadow.close()
+
+    summaries = [summarize(name, trial_results) for name, trial_results in results.items()]
+    off, on = summaries
+    logger.info(f"p99 shadow on - off: {on['p99_ms_median'] - off['p99_ms_median']:+.3f}ms "
+                f"(off spread {off['p99_ms_min']}-{off['p99_ms_max']}, "
+                f"on spread {on['p99_ms_min']}-{on['p99_ms_max']})")
+    return summaries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shadow scoring hot-path benchmark")
+    parser.add_argument("--trials", type=int, default=6, help="interleaved on/off trial pairs")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each trial")
+    parser.add_argument("--load", type=float, default=0.5, help="offered rate as a fraction of capacity")
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    run(args.trials, args.seconds, args.load, args.sample_rate, args.clients, args.queue_size, args.workers)
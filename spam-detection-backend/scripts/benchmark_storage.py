@@ -0,0 +1,157 @@
+"""
+Compare submission storage schemas on a synthetic workload
+Run: python scripts/benchmark_storage.py [--submissions 100000] [--distinct 5000] [--live]
+
+Generates Zipf-distributed repeat traffic (a few bodies are sent very often,
+like real spam campaigns) and reports, per schema, documents stored, data
+size, bytes written per submission (full record rewrite on every update,
+i.e. a conservative write-amplification figure), index entries written
+(a repeat rewrites its last_submitted_at entry) and an uncompressed
+estimate of the setup_db.py indexes. --live replays the same workload into
+a scratch MongoDB database and reports collStats sizes instead.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.repositories import content_hash, hashed_submission_fields
+from datetime import datetime
+from bson import ObjectId, encode
+import numpy as np
+import argparse
+import json
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCRATCH_DB = "spam-detection-storage-bench"
+
+# Key sizes for the index estimate: key + record id + per-entry overhead
+_ENTRY_OVERHEAD = 16
+_KEY_BYTES = {"_id": 12, "submitted_at": 8, "content_hash": 64, "last_submitted_at": 8}
+
+SCHEMAS = {
+    "full": None,
+    "hashed_none": "none",
+    "hashed_truncate": "truncate",
+    "hashed_compress": "compress",
+}
+
+
+def synthetic_workload(submissions, distinct, seed=42):
+    """Return (bodies, sequence of body indexes)"""
+    rng = np.random.default_rng(seed)
+    words = ("free money win click offer prize urgent account verify password meeting "
+             "report lunch invoice project schedule tomorrow thanks regards deal limited "
+             "unsubscribe bank transfer winner claim congratulations update team").split()
+    bodies = []
+    for _ in range(distinct):
+        length = int(rng.integers(80, 700))
+        bodies.append(" ".join(rng.choice(words, size=length)))
+    ranks = rng.zipf(1.2, size=submissions * 2)
+    sequence = (ranks[ranks <= distinct] - 1)[:submissions]
+    return bodies, sequence
+
+
+def simulate(bodies, sequence, body_mode):
+    """Offline model of what each schema writes"""
+    now = datetime.utcnow()
+    docs = {}
+    bytes_written = 0
+    index_entries = 0
+    # Same indexes as setup_db.py; last_submitted_at is sparse, so only hashed docs have an entry
+    indexed_fields = ["_id", "submitted_at"] if body_mode is None else \
+        ["_id", "submitted_at", "content_hash", "last_submitted_at"]
+
+    for position, index in enumerate(sequence):
+        text = bodies[index]
+        if body_mode is None:
+            doc = {"_id": ObjectId(), "email_text": text, "submitted_at": now}
+            docs[position] = len(encode(doc))
+            bytes_written += docs[position]
+            index_entries += len(indexed_fields)
+            continue
+        if index not in docs:
+            doc = dict(hashed_submission_fields(text, body_mode), _id=ObjectId(),
+                       content_hash=content_hash(text), seen_count=1,
+                       submitted_at=now, last_submitted_at=now)
+            docs[index] = len(encode(doc))
+            index_entries += len(indexed_fields)
+        else:
+            # A repeat moves its last_submitted_at index entry
+            index_entries += 1
+        # Inserts and updates both write a full record version
+        bytes_written += docs[index]
+
+    index_bytes = sum((_KEY_BYTES[field] + _ENTRY_OVERHEAD) * len(docs) for field in indexed_fields)
+    return {
+        "documents": len(docs),
+        "data_bytes": sum(docs.values()),
+        "bytes_written_per_submission": round(bytes_written / len(sequence), 1),
+        "index_entries_written": index_entries,
+        "index_bytes_estimate": index_bytes,
+    }
+
+
+def replay_live(bodies, sequence, body_mode):
+    """Replay into a scratch collection and read back collStats"""
+    from common.db import get_db
+    db = get_db()
+    if db is None:
+        raise RuntimeError("MongoDB not available")
+    scratch = db.client[SCRATCH_DB]
+    name = f"submissions_{body_mode or 'full'}"
+    scratch.drop_collection(name)
+    collection = scratch[name]
+    collection.create_index("submitted_at")
+    collection.create_index("last_submitted_at", sparse=True)
+    if body_mode is not None:
+        collection.create_index("content_hash", unique=True)
+
+    for index in sequence:
+        text = bodies[index]
+        now = datetime.utcnow()
+        if body_mode is None:
+            collection.insert_one({"email_text": text, "submitted_at": now})
+        else:
+            collection.update_one(
+                {"content_hash": content_hash(text)},
+                {"$inc": {"seen_count": 1}, "$set": {"last_submitted_at": now},
+                 "$setOnInsert": dict(hashed_submission_fields(text, body_mode), submitted_at=now)},
+                upsert=True,
+            )
+    stats = scratch.command("collStats", name)
+    scratch.drop_collection(name)
+    return {
+        "documents": stats["count"],
+        "data_bytes": stats["size"],
+        "storage_bytes": stats["storageSize"],
+        "index_bytes": stats["totalIndexSize"],
+    }
+
+
+def run(submissions, distinct, live):
+    bodies, sequence = synthetic_workload(submissions, distinct)
+    logger.info(f"Workload: {len(sequence)} submissions, {len(set(sequence.tolist()))} distinct bodies")
+
+    results = {}
+    for schema, body_mode in SCHEMAS.items():
+        results[schema] = replay_live(bodies, sequence, body_mode) if live else simulate(bodies, sequence, body_mode)
+
+    baseline = results["full"]
+    for schema, result in results.items():
+        for metric in ("data_bytes", "bytes_written_per_submission", "index_entries_written",
+                       "index_bytes_estimate", "index_bytes"):
+            if metric in result and baseline.get(metric):
+                result[f"{metric}_vs_full"] = round(result[metric] / baseline[metric], 4)
+        logger.info(f"{schema}: {json.dumps(result)}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Submission storage schema benchmark")
+    parser.add_argument("--submissions", type=int, default=100000)
+    parser.add_argument("--distinct", type=int, default=5000)
+    parser.add_argument("--live", action="store_true", help="replay into a scratch MongoDB database")
+    args = parser.parse_args()
+    run(args.submissions, args.distinct, args.live)
@@ -0,0 +1,258 @@
+"""
+Export classification history to date-partitioned Parquet
+Run: python scripts/export_parquet.py [--out exports] [--full]
+
+Streams spam_submissions and classification_results with batched cursors
+(secondary-preferred reads) and writes Arrow record batches to
+<out>/<collection>/date=YYYY-MM-DD/part-<run>.parquet.
+Exports are incremental: the last exported timestamp per collection is kept
+in <out>/_watermarks.json and only newer documents are read on the next run.
+--full (or a missing watermark) deletes that export's earlier part files
+first, so a re-export never leaves rows in the directory twice.
+Each run stops EXPORT_SAFETY_LAG_SECONDS (default 300) before "now", so
+documents still replicating to the secondary, or stamped just before the
+read but committed after it, are picked up by the next run instead of
+falling behind the watermark. The lag must exceed the worst replication
+lag plus write latency; --primary reads from the primary instead.
+Hashed submissions (SUBMISSION_STORAGE_MODE=hashed) are exported again
+each time seen_count / last_submitted_at change, so spam_submissions may
+hold several rows per _id; the one with the newest last_submitted_at wins.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.db import get_db
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, ReadPreference
+import pyarrow as pa
+import pyarrow.parquet as pq
+import argparse
+import json
+import logging
+import re
+import uuid
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUT_DIR = "exports"
+DEFAULT_BATCH_SIZE = 5000
+WATERMARK_FILE = "_watermarks.json"
+EXPORT_SAFETY_LAG_SECONDS = int(os.getenv("EXPORT_SAFETY_LAG_SECONDS", 300))
+
+SUBMISSION_SCHEMA = pa.schema([
+    ("_id", pa.string()),
+    ("email_text", pa.string()),
+    ("submitted_at", pa.timestamp("ms")),
+    # Deduplicated schema (SUBMISSION_STORAGE_MODE=hashed)
+    ("content_hash", pa.string()),
+    ("seen_count", pa.int64()),
+    ("last_submitted_at", pa.timestamp("ms")),
+    ("email_preview", pa.string()),
+    ("length", pa.int64()),
+])
+
+# export name -> (collection, timestamp field, extra filter, arrow schema)
+# Hashed submissions are updated in place on every repeat, so they are
+# exported by last_submitted_at: a document is written again (into the
+# partition of its latest submission) whenever its counters change.
+# Readers keep the row with the newest last_submitted_at per _id.
+EXPORTS = {
+    "spam_submissions": ("spam_submissions", "submitted_at",
+                         {"last_submitted_at": {"$exists": False}}, SUBMISSION_SCHEMA),
+    "spam_submissions_hashed": ("spam_submissions", "last_submitted_at", {}, SUBMISSION_SCHEMA),
+    "classification_results": ("classification_results", "created_at", {}, pa.schema([
+        ("_id", pa.string()),
+        ("submission_id", pa.string()),
+        ("classification", pa.string()),
+        ("confidence", pa.float64()),
+        ("created_at", pa.timestamp("ms")),
+    ])),
+}
+
+_ID_FIELDS = ("_id", "submission_id")
+
+
+def load_watermarks(out_dir):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {name: datetime.fromisoformat(ts) for name, ts in json.load(f).items()}
+
+
+def save_watermarks(out_dir, watermarks):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({name: ts.isoformat() for name, ts in watermarks.items()}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class _PartitionWriter:
+    """Keeps one Parquet file open at a time; input must be sorted by date"""
+
+    def __init__(self, base_dir, schema, run_id):
+        self.base_dir = base_dir
+        self.schema = schema
+        self.run_id = run_id
+        self.date = None
+        self.writer = None
+        self.path = None
+
+    def write(self, date, batch):
+        if date != self.date:
+            self.close()
+            partition_dir = os.path.join(self.base_dir, f"date={date}")
+            os.makedirs(partition_dir, exist_ok=True)
+            self.date = date
+            self.path = os.path.join(partition_dir, f"part-{self.run_id}.parquet")
+            self.writer = pq.ParquetWriter(self.path + ".tmp", self.schema, compression="zstd")
+        self.writer.write_batch(batch)
+
+    def close(self):
+        """Finish the current file; returns True if a partition was completed"""
+        if self.writer is None:
+            return False
+        self.writer.close()
+        os.replace(self.path + ".tmp", self.path)
+        self.writer = None
+        return True
+
+
+def remove_export_files(base_dir, suffix):
+    """Delete every part file of one export (run ids never contain '-')"""
+    pattern = re.compile(rf"part-[^-]+{re.escape(suffix)}\.parquet(\.tmp)?")
+    removed = 0
+    if not os.path.isdir(base_dir):
+        return removed
+    for entry in os.listdir(base_dir):
+        partition_dir = os.path.join(base_dir, entry)
+        if not entry.startswith("date=") or not os.path.isdir(partition_dir):
+            continue
+        for file_name in os.listdir(partition_dir):
+            if pattern.fullmatch(file_name):
+                os.remove(os.path.join(partition_dir, file_name))
+                removed += 1
+        if not os.listdir(partition_dir):
+            os.rmdir(partition_dir)
+    return removed
+
+
+def _to_batch(rows, schema):
+    columns = {field.name: [row.get(field.name) for row in rows] for field in schema}
+    for name in _ID_FIELDS:
+        if name in columns:
+            columns[name] = [str(value) if value is not None else None for value in columns[name]]
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def export_collection(db, name, out_dir, watermarks, batch_size, run_id, until,
+                      read_preference=ReadPreference.SECONDARY_PREFERRED):
+    """Stream one collection into date partitions, advancing its watermark per partition"""
+    collection_name, ts_field, extra_filter, schema = EXPORTS[name]
+    collection = db.get_collection(collection_name, read_preference=read_preference)
+
+    query = dict(extra_filter, **{ts_field: {"$lte": until}})
+    if name in watermarks:
+        query[ts_field]["$gt"] = watermarks[name]
+
+    cursor = collection.find(
+        query,
+        projection={field.name: 1 for field in schema},
+        sort=[(ts_field, ASCENDING)],
+        batch_size=batch_size,
+    )
+
+    # Exports of one collection share its directory; file names keep them apart
+    suffix = "" if name == collection_name else f"-{name}"
+    base_dir = os.path.join(out_dir, collection_name)
+    if name not in watermarks:
+        # Full (re-)export: earlier files of this export would be read twice
+        removed = remove_export_files(base_dir, suffix)
+        if removed:
+            logger.info(f"Removed {removed} previously exported {name} files")
+    writer = _PartitionWriter(base_dir, schema, run_id + suffix)
+    rows = []
+    rows_date = None
+    exported = 0
+    last_ts = None
+
+    def flush():
+        nonlocal rows, exported
+        if rows:
+            writer.write(rows_date, _to_batch(rows, schema))
+            exported += len(rows)
+            rows = []
+
+    try:
+        for doc in cursor:
+            ts = doc.get(ts_field)
+            if ts is None:
+                continue
+            date = ts.strftime("%Y-%m-%d")
+            if date != rows_date or len(rows) >= batch_size:
+                flush()
+                if date != rows_date and writer.close():
+                    # Partition is complete on disk - safe to move the watermark
+                    watermarks[name] = last_ts
+                    save_watermarks(out_dir, watermarks)
+                rows_date = date
+            rows.append(doc)
+            last_ts = ts
+        flush()
+        if writer.close():
+            watermarks[name] = last_ts
+            save_watermarks(out_dir, watermarks)
+    finally:
+        cursor.close()
+        if writer.writer is not None:
+            # Interrupted mid-partition: drop the half-written file
+            writer.writer.close()
+            os.remove(writer.path + ".tmp")
+
+    logger.info(f"✓ {name}: exported {exported} rows")
+    return exported
+
+
+def export_all(out_dir=DEFAULT_OUT_DIR, batch_size=DEFAULT_BATCH_SIZE, full=False, collections=None,
+               safety_lag=EXPORT_SAFETY_LAG_SECONDS, primary=False):
+    db = get_db()
+    if db is None:
+        logger.error("Cannot connect to MongoDB")
+        return False
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        watermarks = load_watermarks(out_dir)
+        if full:
+            for name in collections or EXPORTS:
+                watermarks.pop(name, None)
+            save_watermarks(out_dir, watermarks)
+        now = datetime.utcnow()
+        # Sortable by time; the random tail keeps runs in the same second apart
+        run_id = f"{now.strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        # Never advance the watermark into the window where writes may still land
+        until = now - timedelta(seconds=safety_lag)
+        read_preference = ReadPreference.PRIMARY if primary else ReadPreference.SECONDARY_PREFERRED
+        for name in collections or EXPORTS:
+            export_collection(db, name, out_dir, watermarks, batch_size, run_id, until, read_preference)
+        logger.info("\n✓ Export complete!")
+        return True
+    except Exception as e:
+        logger.error(f"✗ Error: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export classification history to Parquet")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="output directory")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--full", action="store_true", help="ignore watermarks and export everything")
+    parser.add_argument("--collection", action="append", choices=list(EXPORTS),
+                        help="limit to one collection (repeatable)")
+    parser.add_argument("--safety-lag", type=int, default=EXPORT_SAFETY_LAG_SECONDS,
+                        help="seconds before now where the export stops (default %(default)s)")
+    parser.add_argument("--primary", action="store_true", help="read from the primary instead of a secondary")
+    args = parser.parse_args()
+    sys.exit(0 if export_all(args.out, args.batch_size, args.full, args.collection,
+                             args.safety_lag, args.primary) else 1)
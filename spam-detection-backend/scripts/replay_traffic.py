@@ -0,0 +1,377 @@
+"""
+Replay captured traffic for regression and capacity testing
+Run: python scripts/replay_traffic.py [--source mongo|PATH] [--target service|http] [--speed 1.0]
+
+Streams stored emails in submission order from spam_submissions (default),
+a Parquet export directory (scripts/export_parquet.py) or a JSONL capture
+file, and replays them against MLService in-process or /api/ml/predict.
+Sends keep the original inter-arrival gaps divided by --speed
+(--speed 0 sends as fast as --concurrency allows). Latency is measured
+both as service time and from the scheduled send time, so a target that
+falls behind shows up as queueing instead of a slower offered rate.
+
+Reports throughput, latency percentiles and verdict diffs against the
+stored classification_results to reports/replay_<timestamp>.json.
+--save-capture writes the streamed records to JSONL for repeatable runs.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.repositories import submission_body
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+import http.client
+import heapq
+import urllib.parse
+import numpy as np
+import threading
+import argparse
+import time
+import json
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+REPORT_DIR = "reports"
+MONGO_BATCH_SIZE = 500
+MAX_DIFF_SAMPLES = 20
+CANDIDATE_MODEL_ID = "replay-candidate"
+
+
+# ===== CAPTURE SOURCES =====
+# Every source yields {"submission_id", "email_text", "submitted_at", "classification"}
+# in submission order; "classification" is the stored verdict (None if unknown).
+
+def _mongo_records(since=None, limit=0):
+    from common.db import get_db
+    db = get_db()
+    if db is None:
+        raise RuntimeError("MongoDB not available")
+    query = {"submitted_at": {"$gte": since}} if since else {}
+    cursor = (db.spam_submissions.find(query).sort("submitted_at", ASCENDING)
+              .batch_size(MONGO_BATCH_SIZE).limit(limit))
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) == MONGO_BATCH_SIZE:
+            yield from _join_verdicts(db, batch)
+            batch = []
+    yield from _join_verdicts(db, batch)
+
+
+def _join_verdicts(db, submissions):
+    """Attach the latest stored verdict to a batch of submissions"""
+    if not submissions:
+        return
+    verdicts = {}
+    results = db.classification_results.find(
+        {"submission_id": {"$in": [doc["_id"] for doc in submissions]}},
+        {"submission_id": 1, "classification": 1},
+    ).sort("created_at", ASCENDING)
+    for result in results:
+        verdicts[result["submission_id"]] = result["classification"]
+    for doc in submissions:
+        text = submission_body(doc)
+        # A truncated preview (hashed storage) cannot be replayed faithfully
+        if text is not None and len(text) < doc.get("length", len(text)):
+            text = None
+        yield {
+            "submission_id": str(doc["_id"]),
+            "email_text": text,
+            "submitted_at": doc["submitted_at"],
+            "classification": verdicts.get(doc["_id"]),
+        }
+
+
+def _partitions(base_dir):
+    """(date, files) of one exported collection, in date and run order"""
+    if not os.path.isdir(base_dir):
+        return
+    for entry in sorted(os.listdir(base_dir)):
+        directory = os.path.join(base_dir, entry)
+        if entry.startswith("date=") and os.path.isdir(directory):
+            yield entry[len("date="):], sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                                               if name.endswith(".parquet"))
+
+
+def _parquet_rows(path, columns):
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=MONGO_BATCH_SIZE, columns=columns):
+        yield from batch.to_pylist()
+
+
+def _parquet_verdicts(results_dir, date):
+    """submission_id -> latest verdict for one results partition (no bodies read)"""
+    verdicts = {}
+    for path in next((files for day, files in _partitions(results_dir) if day == date), []):
+        for row in _parquet_rows(path, ["submission_id", "classification"]):
+            verdicts[row["submission_id"]] = row["classification"]
+    return verdicts
+
+
+def _parquet_records(export_dir, since=None, limit=0):
+    """
+    Stream an export partition by partition. Each file is sorted by
+    submitted_at, so the runs of one day are merged lazily; verdicts are
+    looked up in the same day's and the next day's results partitions
+    (a result can be stamped just after midnight).
+    """
+    results_dir = os.path.join(export_dir, "classification_results")
+    verdicts_by_date = {}
+    since_date = since.strftime("%Y-%m-%d") if since else None
+    count = 0
+    for date, files in _partitions(os.path.join(export_dir, "spam_submissions")):
+        if since_date and date < since_date:
+            continue
+        next_date = (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        verdicts_by_date = {day: verdicts_by_date.get(day) or _parquet_verdicts(results_dir, day)
+                            for day in (date, next_date)}
+
+        # Hashed submissions carry no full body in the export and are ordered by
+        # last_submitted_at, so they cannot be replayed
+        files = [path for path in files if not path.endswith("-spam_submissions_hashed.parquet")]
+        rows = heapq.merge(*(_parquet_rows(path, ["_id", "email_text", "submitted_at"]) for path in files),
+                           key=lambda row: row["submitted_at"])
+        for row in rows:
+            if since and row["submitted_at"] < since:
+                continue
+            submission_id = row["_id"]
+            yield {
+                "submission_id": submission_id,
+                "email_text": row["email_text"],
+                "submitted_at": row["submitted_at"],
+                "classification": verdicts_by_date[next_date].get(
+                    submission_id, verdicts_by_date[date].get(submission_id)),
+            }
+            count += 1
+            if limit and count >= limit:
+                return
+
+
+def _jsonl_records(path, since=None, limit=0):
+    count = 0
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            record["submitted_at"] = datetime.fromisoformat(record["submitted_at"])
+            if since and record["submitted_at"] < since:
+                continue
+            yield record
+            count += 1
+            if limit and count >= limit:
+                return
+
+
+def open_source(source, since=None, limit=0):
+    if source == "mongo":
+        return _mongo_records(since, limit)
+    if os.path.isdir(source):
+        return _parquet_records(source, since, limit)
+    return _jsonl_records(source, since, limit)
+
+
+def save_capture(records, path):
+    """Pass records through while writing them to a JSONL capture file"""
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(dict(record, submitted_at=record["submitted_at"].isoformat())) + "\n")
+            yield record
+
+
+# ===== TARGETS =====
+# A target is a callable: email_text -> classification ("spam" / "ham")
+
+def service_target(model_id=None, model_path=None):
+    from spam_detection_service.ml_service import ml_service
+    if model_path:
+        ml_service.registry.paths[CANDIDATE_MODEL_ID] = model_path
+        model_id = CANDIDATE_MODEL_ID
+    if not ml_service.is_known_model(model_id):
+        raise RuntimeError(f"Unknown model: {model_id}")
+    return lambda email_text: ml_service.predict(email_text, model_id)[0]
+
+
+def http_target(base_url, username, password, model_id=None):
+    """Keep-alive connection per replay thread, JWT from /auth/login"""
+    url = urllib.parse.urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+    local = threading.local()
+
+    def request(method, path, body, headers):
+        for attempt in range(2):
+            if getattr(local, "connection", None) is None:
+                local.connection = connection_class(url.netloc, timeout=30)
+            try:
+                local.connection.request(method, path, json.dumps(body),
+                                         dict(headers, **{"Content-Type": "application/json"}))
+                response = local.connection.getresponse()
+                return response.status, json.loads(response.read() or b"{}")
+            except (http.client.HTTPException, ConnectionError):
+                # Server closed the kept-alive connection; reconnect once
+                local.connection.close()
+                local.connection = None
+                if attempt:
+                    raise
+
+    status, body = request("POST", "/auth/login", {"username": username, "password": password}, {})
+    if status != 200:
+        raise RuntimeError(f"Login failed: {status} {body}")
+    headers = {"Authorization": f"Bearer {body['access_token']}"}
+
+    def predict(email_text):
+        payload = {"email_text": email_text}
+        if model_id:
+            payload["model"] = model_id
+        status, body = request("POST", "/api/ml/predict", payload, headers)
+        if status != 200:
+            raise RuntimeError(f"HTTP {status}: {body.get('error')}")
+        return body["classification"]
+
+    return predict
+
+
+# ===== REPLAY =====
+
+class _Results:
+    def __init__(self):
+        self.service_ms = []
+        self.response_ms = []
+        self.lag_ms = []
+        self.errors = Counter()
+        self.verdicts = Counter()  # (stored, replayed) -> count
+        self.diff_samples = []
+        self._lock = threading.Lock()
+
+    def record(self, record, classification, due, started, finished):
+        with self._lock:
+            self.service_ms.append((finished - started) * 1000)
+            self.response_ms.append((finished - due) * 1000)
+            self.lag_ms.append((started - due) * 1000)
+            stored = record["classification"]
+            self.verdicts[(stored, classification)] += 1
+            if stored and stored != classification and len(self.diff_samples) < MAX_DIFF_SAMPLES:
+                self.diff_samples.append({"submission_id": record["submission_id"], "stored": stored,
+                                          "replayed": classification, "email_text": record["email_text"][:80]})
+
+    def record_error(self, error):
+        with self._lock:
+            self.errors[type(error).__name__] += 1
+
+
+def replay(records, target, speed=1.0, concurrency=8):
+    """Send records on their (scaled) original schedule; returns a report dict"""
+    results = _Results()
+    in_flight = threading.BoundedSemaphore(concurrency * 16)
+    skipped = 0
+    first_ts = last_ts = None
+    start = time.perf_counter()
+
+    def send(record, due):
+        started = time.perf_counter()
+        try:
+            classification = target(record["email_text"])
+            results.record(record, classification, due, started, time.perf_counter())
+        except Exception as e:
+            results.record_error(e)
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        for record in records:
+            if not record.get("email_text"):
+                skipped += 1
+                continue
+            if first_ts is None:
+                first_ts = record["submitted_at"]
+            last_ts = record["submitted_at"]
+            if speed > 0:
+                due = start + (record["submitted_at"] - first_ts).total_seconds() / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                due = time.perf_counter()
+            in_flight.acquire()
+            pool.submit(send, record, due)
+    elapsed = time.perf_counter() - start
+
+    completed = len(results.service_ms)
+    captured_seconds = (last_ts - first_ts).total_seconds() if first_ts else 0.0
+    compared = sum(count for (stored, _), count in results.verdicts.items() if stored)
+    agreed = sum(count for (stored, replayed), count in results.verdicts.items() if stored and stored == replayed)
+    return {
+        "speed": speed,
+        "concurrency": concurrency,
+        "sent": completed + sum(results.errors.values()),
+        "completed": completed,
+        "skipped_no_body": skipped,
+        "errors": dict(results.errors),
+        "elapsed_s": round(elapsed, 3),
+        "captured_span_s": round(captured_seconds, 3),
+        "offered_rps": round(completed / (captured_seconds / speed), 1) if speed > 0 and captured_seconds else None,
+        "throughput_rps": round(completed / elapsed, 1) if elapsed else None,
+        "service_ms": _percentiles(results.service_ms),
+        "response_ms": _percentiles(results.response_ms),
+        "schedule_lag_ms": _percentiles(results.lag_ms),
+        "verdicts": {
+            "compared": compared,
+            "agreement_rate": round(agreed / compared, 4) if compared else None,
+            "changes": {f"{stored}->{replayed}": count for (stored, replayed), count in results.verdicts.items()
+                        if stored and stored != replayed},
+            "no_stored_verdict": sum(count for (stored, _), count in results.verdicts.items() if not stored),
+            "samples": results.diff_samples,
+        },
+    }
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    return {name: round(float(np.percentile(values, q)), 3)
+            for name, q in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))}
+
+
+def write_report(report, path=None):
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = path or os.path.join(REPORT_DIR, f"replay_{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"✓ Replay report written to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured submissions against the classifier")
+    parser.add_argument("--source", default="mongo",
+                        help="'mongo', a Parquet export directory, or a JSONL capture file")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only submissions at or after this time")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--save-capture", help="also write the streamed records to this JSONL file")
+    parser.add_argument("--target", choices=["service", "http"], default="service")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--username", default=os.getenv("ADMIN_USER", "admin"))
+    parser.add_argument("--password", default=os.getenv("ADMIN_PASS", "spam-detection-2025"))
+    parser.add_argument("--model", help="registry model id to replay against")
+    parser.add_argument("--model-path", help="candidate pickle to replay against (service target only)")
+    parser.add_argument("--speed", type=float, default=1.0, help="multiple of the original rate; 0 = unthrottled")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--report", help="report path (default reports/replay_<timestamp>.json)")
+    args = parser.parse_args()
+
+    if args.target == "http":
+        target = http_target(args.url, args.username, args.password, args.model)
+    else:
+        target = service_target(args.model, args.model_path)
+
+    records = open_source(args.source, args.since, args.limit)
+    if args.save_capture:
+        records = save_capture(records, args.save_capture)
+
+    report = replay(records, target, speed=args.speed, concurrency=args.concurrency)
+    report.update(source=args.source, target=args.target, model=args.model_path or args.model or "default")
+    logger.info(json.dumps({key: report[key] for key in ("completed", "errors", "throughput_rps",
+                                                         "service_ms", "response_ms", "verdicts")}, default=str)[:2000])
+    write_report(report, args.report)
@@ -2,11 +2,34 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from common.db import get_db
+from pymongo.errors import OperationFailure
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Raw classification results expire after this many days (0 = keep forever)
+RESULTS_RETENTION_DAYS = int(os.getenv("RESULTS_RETENTION_DAYS", 0))
+
+def ensure_ttl_index(collection, field, days):
+    """Create (or convert an existing plain index into) a TTL index on field"""
+    if days <= 0:
+        try:
+            collection.create_index(field)
+        except OperationFailure:
+            logger.warning(f"{collection.name}.{field} already has a TTL index - left unchanged")
+        return
+    seconds = days * 24 * 3600
+    try:
+        collection.create_index(field, expireAfterSeconds=seconds)
+    except OperationFailure:
+        # Index already exists with other options - change its TTL in place
+        collection.database.command(
+            "collMod", collection.name,
+            index={"keyPattern": {field: 1}, "expireAfterSeconds": seconds}
+        )
+    logger.info(f"✓ {collection.name}.{field} expires after {days} days")
+
 def setup_mongodb():
     db = get_db()
     if db is None:
@@ -17,11 +40,18 @@ def setup_mongodb():
             db.create_collection("spam_submissions")
             logger.info("✓ Created spam_submissions")
         db.spam_submissions.create_index("submitted_at")
+        # Deduplicated submissions (SUBMISSION_STORAGE_MODE=hashed)
+        db.spam_submissions.create_index(
+            "content_hash", unique=True,
+            partialFilterExpression={"content_hash": {"$exists": True}}
+        )
+        # Incremental export of hashed submissions follows their latest repeat
+        db.spam_submissions.create_index("last_submitted_at", sparse=True)
 
         if "classification_results" not in db.list_collection_names():
             db.create_collection("classification_results")
             logger.info("✓ Created classification_results")
-        db.classification_results.create_index("created_at")
+        ensure_ttl_index(db.classification_results, "created_at", RESULTS_RETENTION_DAYS)
         db.classification_results.create_index("submission_id")
 
         if "daily_reports" not in db.list_collection_names():
@@ -4,18 +4,22 @@ Email Spam Detection Flask API
 Distributed System with JWT Auth & Circuit Breaker
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 import logging
-import traceback
+
+from common.logging_setup import setup_logging, get_logging_stats
 
 # Import custom modules
 from .circuit_breaker import ml_circuit_breaker, get_all_breakers_status
-from .auth import JWT_SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES, validate_credentials, log_auth_attempt
-from .ml_service import ml_service
+from .auth import JWT_SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES, validate_credentials, log_auth_attempt, is_admin
+from .ml_service import ml_service, DEFAULT_MODEL_ID
+from .model_registry import UnknownModel, ModelLoadError
+from .mime_parser import extract_email_text
+from .profiling import PROFILING_ENABLED, profile_request, sample_stacks, format_collapsed, get_profile
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging (queue-based, JSON unless LOG_FORMAT=text)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # ===== FLASK APP SETUP =====
@@ -30,7 +34,7 @@ jwt = JWTManager(app)
 logger.info("=" * 50)
 logger.info("FLASK APP STARTING")
 logger.info("=" * 50)
-logger.info(f"Model status: {'LOADED' if ml_service.is_loaded() else 'NOT LOADED'}")
+logger.info("Model status: %s", 'LOADED' if ml_service.is_loaded() else 'NOT LOADED')
 logger.info("=" * 50)
 
 # ===== AUTHENTICATION ENDPOINTS =====
@@ -60,7 +64,7 @@ def login():
             return jsonify({"error": "Invalid credentials"}), 401
             
     except Exception as e:
-        logger.error(f"Login error: {e}")
+        logger.error("Login error: %s", e)
         return jsonify({"error": "Authentication failed"}), 500
 
 @app.route('/auth/verify', methods=['GET'])
@@ -74,7 +78,7 @@ def verify_token():
             "user": current_user
         }), 200
     except Exception as e:
-        logger.error(f"Token verification error: {e}")
+        logger.error("Token verification error: %s", e)
         return jsonify({"error": "Token verification failed"}), 401
 
 # ===== HEALTH CHECK ENDPOINTS =====
@@ -94,10 +98,43 @@ def model_info():
     """Get model information"""
     return jsonify(ml_service.get_info()), 200
 
+@app.route('/api/ml/models', methods=['GET'])
+@jwt_required()
+def registry_status():
+    """Per-model load time, residency and eviction counts of the model registry"""
+    return jsonify(ml_service.registry.get_status()), 200
+
 # ===== ML PREDICTION ENDPOINT =====
 
+def requested_model_id(data=None):
+    """
+    Model selector: "model" in the JSON body or query string, or X-Model-Id.
+    A body value is returned as sent (even if not a string) so that the
+    registry rejects it as unknown instead of silently using the default.
+    """
+    if isinstance(data, dict) and data.get('model') is not None:
+        return data['model']
+    return request.args.get('model') or request.headers.get('X-Model-Id')
+
+def model_error_response(model_id):
+    """
+    Load the selected model outside the circuit breaker. Returns an error
+    response (404 unknown, 503 failed load with retry_after) or None.
+    """
+    try:
+        ml_service.load_selected_model(model_id)
+    except UnknownModel:
+        return jsonify({"error": f"Unknown model: {model_id}"}), 404
+    except ModelLoadError as e:
+        return jsonify({
+            "error": f"Model {model_id} is unavailable",
+            "retry_after": e.retry_after
+        }), 503
+    return None
+
 @app.route('/api/ml/predict', methods=['POST'])
 @jwt_required()
+@profile_request
 def predict():
     """Predict if email is spam or ham with Circuit Breaker protection"""
     try:
@@ -112,26 +149,32 @@ def predict():
         if not email_text:
             return jsonify({"error": "email_text cannot be empty"}), 400
         
+        model_id = requested_model_id(data)
+        error = model_error_response(model_id)
+        if error:
+            return error
+        
         # Make prediction with circuit breaker
         try:
             @ml_circuit_breaker
             def make_prediction():
                 """Wrapped prediction function for circuit breaker"""
-                return ml_service.predict(email_text)
+                return ml_service.predict(email_text, model_id)
             
             classification, confidence = make_prediction()
             
-            logger.info(f"User {current_user} - Prediction: {classification} (confidence: {confidence})")
+            logger.info("User %s - Prediction: %s (confidence: %s)", current_user, classification, confidence)
             
             return jsonify({
                 "email_text": email_text[:50],
                 "classification": classification,
                 "confidence": confidence,
+                "model": model_id or DEFAULT_MODEL_ID,
                 "user": current_user
             }), 200
             
         except Exception as circuit_error:
-            logger.error(f"Circuit breaker triggered or prediction error: {circuit_error}")
+            logger.error("Circuit breaker triggered or prediction error: %s", circuit_error)
             
             if ml_circuit_breaker.opened:
                 logger.warning("ML Circuit Breaker is OPEN - service temporarily unavailable")
@@ -141,18 +184,144 @@ def predict():
                     "circuit_breaker_status": "OPEN"
                 }), 503
             else:
-                logger.error(f"Prediction error: {circuit_error}")
-                traceback.print_exc()
+                logger.exception("Prediction error: %s", circuit_error)
                 return jsonify({
                     "error": "Prediction failed",
                     "circuit_breaker_status": str(ml_circuit_breaker.state)
                 }), 500
             
     except Exception as e:
-        logger.error(f"Request error: {e}")
-        traceback.print_exc()
+        logger.exception("Request error: %s", e)
+        return jsonify({"error": "Request processing failed"}), 500
+
+@app.route('/api/ml/predict-raw', methods=['POST'])
+@jwt_required()
+def predict_raw():
+    """
+    Classify a raw RFC 822 message sent as the request body.
+    The body is parsed as a stream; attachments are skipped without decoding
+    and only the first MAX_TEXT_BYTES of text reach the model. The text is
+    not run through preprocess_email: the model was trained on raw text (its
+    vectorizer lowercases and tokenizes), exactly what /predict sends.
+    Parsing happens outside the circuit breaker so malformed client input
+    cannot open it for everyone.
+    """
+    try:
+        current_user = get_jwt_identity()
+        model_id = requested_model_id()
+        error = model_error_response(model_id)
+        if error:
+            return error
+
+        try:
+            extraction = extract_email_text(request.stream)
+        except Exception as e:
+            logger.warning("Unparseable raw message from %s: %s", current_user, e)
+            return jsonify({"error": "Malformed message"}), 400
+
+        if not extraction["text"]:
+            return jsonify({"error": "No text content found in message"}), 400
+
+        try:
+            @ml_circuit_breaker
+            def make_prediction():
+                """Wrapped prediction function for circuit breaker"""
+                return ml_service.predict(extraction["text"], model_id)
+
+            classification, confidence = make_prediction()
+
+        except Exception as circuit_error:
+            logger.error("Circuit breaker triggered or prediction error: %s", circuit_error)
+
+            if ml_circuit_breaker.opened:
+                return jsonify({
+                    "error": "Prediction service temporarily unavailable",
+                    "retry_after": 60,
+                    "circuit_breaker_status": "OPEN"
+                }), 503
+            logger.exception("Prediction error: %s", circuit_error)
+            return jsonify({
+                "error": "Prediction failed",
+                "circuit_breaker_status": str(ml_circuit_breaker.state)
+            }), 500
+
+        logger.info("User %s - Raw prediction: %s (confidence: %s)", current_user, classification, confidence)
+
+        return jsonify({
+            "subject": extraction["subject"][:100],
+            "email_text": extraction["text"][:50],
+            "classification": classification,
+            "confidence": confidence,
+            "model": model_id or DEFAULT_MODEL_ID,
+            "bytes_read": extraction["bytes_read"],
+            "parts_decoded": extraction["parts_decoded"],
+            "parts_skipped": extraction["parts_skipped"],
+            "truncated": extraction["truncated"],
+            "user": current_user
+        }), 200
+
+    except Exception as e:
+        logger.exception("Request error: %s", e)
         return jsonify({"error": "Request processing failed"}), 500
 
+# ===== SHADOW SCORING STATUS ENDPOINT =====
+
+@app.route('/api/ml/shadow-status', methods=['GET'])
+@jwt_required()
+def shadow_status():
+    """Agreement, confidence delta and latency of shadow candidate models"""
+    if not ml_service.shadow:
+        return jsonify({"enabled": False}), 200
+    return jsonify(dict(ml_service.shadow.get_status(), enabled=True)), 200
+
+# ===== ADMIN PROFILING ENDPOINTS =====
+
+def admin_profiling_guard():
+    """Return an error response unless profiling is enabled and the caller is admin"""
+    if not PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    if not is_admin(get_jwt_identity()):
+        return jsonify({"error": "Access forbidden"}), 403
+    return None
+
+@app.route('/api/admin/profile', methods=['POST'])
+@jwt_required()
+def sampling_profile():
+    """
+    Sample all threads for ?seconds=N (default 10, max 60)
+    Returns collapsed stacks (text/plain) or ?format=json
+    """
+    error = admin_profiling_guard()
+    if error:
+        return error
+
+    seconds = request.args.get('seconds', 10, type=float)
+    interval_ms = request.args.get('interval_ms', 5, type=float)
+    stacks = sample_stacks(seconds, interval_ms)
+    if stacks is None:
+        return jsonify({"error": "A profiling session is already running"}), 409
+
+    logger.info("Sampling profile by %s: %ss, %s samples", get_jwt_identity(), seconds, sum(stacks.values()))
+    if request.args.get('format') == 'json':
+        return jsonify({
+            "samples": sum(stacks.values()),
+            "stacks": [{"stack": stack, "count": count} for stack, count in stacks.most_common()]
+        }), 200
+    return Response(format_collapsed(stacks), mimetype='text/plain')
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+def request_profile(profile_id):
+    """Fetch a per-request profile captured with the X-Profile header"""
+    error = admin_profiling_guard()
+    if error:
+        return error
+
+    profile = get_profile(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return Response(profile, mimetype='text/plain')
+
 # ===== CIRCUIT BREAKER STATUS ENDPOINT =====
 
 @app.route('/api/ml/circuit-breaker-status', methods=['GET'])
@@ -162,8 +331,7 @@ def circuit_breaker_status():
     try:
         return jsonify(get_all_breakers_status()), 200
     except Exception as e:
-        logger.error(f"Circuit breaker status error: {e}")
-        traceback.print_exc()
+        logger.exception("Circuit breaker status error: %s", e)
         return jsonify({
             "error": "Failed to get circuit breaker status",
             "details": str(e)
@@ -180,6 +348,7 @@ def status():
         "model": "loaded" if ml_service.is_loaded() else "not_loaded",
         "database": "connected",
         "circuit_breaker_ml": str(ml_circuit_breaker.state),
+        "logging": get_logging_stats(),
         "timestamp": str(__import__('datetime').datetime.now()),
         "authenticated_user": get_jwt_identity()
     }), 200
@@ -204,7 +373,7 @@ def not_found(error):
 @app.errorhandler(500)
 def internal_error(error):
     """Handle internal server error"""
-    logger.error(f"Internal server error: {error}")
+    logger.error("Internal server error: %s", error)
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == '__main__':
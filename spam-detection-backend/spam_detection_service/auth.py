@@ -26,9 +26,13 @@ def validate_credentials(username, password):
         return True
     return False
 
+def is_admin(username):
+    """Admin-only endpoints (e.g. profiling) are restricted to the admin user"""
+    return username == ADMIN_USER
+
 def log_auth_attempt(username, success):
     """Log authentication attempts"""
     if success:
-        logger.info(f"✓ User {username} authenticated successfully")
+        logger.info("✓ User %s authenticated successfully", username)
     else:
-        logger.warning(f"✗ Failed authentication attempt for user: {username}")
+        logger.warning("✗ Failed authentication attempt for user: %s", username)
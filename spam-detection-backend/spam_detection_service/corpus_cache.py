@@ -0,0 +1,263 @@
+# spam_detection_service/corpus_cache.py
+"""
+Training Corpus Cache
+Keeps the tokenized training corpus as a memory-mappable CSR term-count
+matrix so retraining does not re-read and re-tokenize every document.
+
+Layout: <cache_dir>/<vectorizer key>/{meta.json, terms.json, labels.npy,
+data.npy, indices.npy, indptr.npy}. The vocabulary only grows, so rows
+appended to the CSV are tokenized on their own and stacked onto the
+cached matrix.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+import logging
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import sklearn
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfTransformer
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("CORPUS_CACHE_DIR", "data/.corpus_cache")
+
+# Vectorizer params that change tokenization (and therefore the cached counts)
+_ANALYZER_PARAMS = (
+    "analyzer", "lowercase", "stop_words", "token_pattern",
+    "ngram_range", "strip_accents", "preprocessor", "tokenizer",
+)
+
+_ARRAYS = ("data", "indices", "indptr", "labels")
+
+
+def cache_key(vectorizer):
+    """Key the cache on everything that affects the token stream"""
+    params = vectorizer.get_params()
+    config = {name: params.get(name) for name in _ANALYZER_PARAMS}
+    if callable(config["analyzer"]) or config["preprocessor"] or config["tokenizer"]:
+        return None  # custom callables cannot be hashed reliably
+    config["sklearn"] = sklearn.__version__
+    blob = json.dumps(config, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def _tokenize(texts, analyzer, terms, vocabulary):
+    """Count tokens per document, extending the vocabulary in place"""
+    indptr = [0]
+    indices = []
+    data = []
+    for text in texts:
+        counts = Counter(analyzer(text if isinstance(text, str) else ""))
+        for term, count in counts.items():
+            column = vocabulary.get(term)
+            if column is None:
+                column = vocabulary[term] = len(terms)
+                terms.append(term)
+            indices.append(column)
+            data.append(count)
+        indptr.append(len(indices))
+    return (np.asarray(data, dtype=np.int32),
+            np.asarray(indices, dtype=np.int32),
+            np.asarray(indptr, dtype=np.int64))
+
+
+class CorpusCache:
+    """Cached term counts for one CSV + vectorizer configuration"""
+
+    def __init__(self, csv_path, vectorizer, cache_dir=CACHE_DIR,
+                 text_column="text", label_column="label"):
+        self.csv_path = csv_path
+        self.vectorizer = vectorizer
+        self.text_column = text_column
+        self.label_column = label_column
+        self.key = cache_key(vectorizer)
+        self.path = os.path.join(cache_dir, self.key) if self.key else None
+        self.timings = {}
+
+    # ----- persistence -----
+
+    def _read_meta(self):
+        if not self.path:
+            return None
+        try:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load_arrays(self, mmap_mode="r"):
+        arrays = {name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in _ARRAYS}
+        with open(os.path.join(self.path, "terms.json")) as f:
+            terms = json.load(f)
+        return arrays, terms
+
+    def _save(self, arrays, terms, meta):
+        """Write into a sibling directory and swap it in"""
+        tmp_path = self.path + ".tmp"
+        old_path = self.path + ".old"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), arrays[name])
+        with open(os.path.join(tmp_path, "terms.json"), "w") as f:
+            json.dump(terms, f)
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.rename(self.path, old_path)
+        os.rename(tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    # ----- stages -----
+
+    def _stage(self, name, started):
+        self.timings[name] = time.perf_counter() - started
+
+    def _parse(self, raw, columns=None):
+        started = time.perf_counter()
+        if columns:
+            df = pd.read_csv(io.BytesIO(raw), header=None, names=columns)
+        else:
+            df = pd.read_csv(io.BytesIO(raw))
+        self._stage("parse_csv", started)
+        return df
+
+    def _build(self, raw, digest):
+        df = self._parse(raw)
+        started = time.perf_counter()
+        terms = []
+        data, indices, indptr = _tokenize(
+            df[self.text_column].values, self.vectorizer.build_analyzer(), terms, {})
+        self._stage("tokenize", started)
+
+        arrays = {"data": data, "indices": indices, "indptr": indptr,
+                  "labels": df[self.label_column].values.astype(np.int64)}
+        meta = {
+            "source_size": len(raw),
+            "source_sha256": digest,
+            "columns": list(df.columns),
+            "n_docs": len(df),
+            "cold_timings": dict(self.timings),
+        }
+        if self.path:
+            started = time.perf_counter()
+            self._save(arrays, terms, meta)
+            self._stage("save_cache", started)
+        return arrays, terms, meta
+
+    def _append(self, raw, digest, meta):
+        # Read into memory - the cache directory is replaced below
+        cached, terms = self._load_arrays(mmap_mode=None)
+        df = self._parse(raw[meta["source_size"]:], meta["columns"])
+
+        started = time.perf_counter()
+        vocabulary = {term: column for column, term in enumerate(terms)}
+        data, indices, indptr = _tokenize(
+            df[self.text_column].values, self.vectorizer.build_analyzer(), terms, vocabulary)
+        self._stage("tokenize", started)
+
+        arrays = {
+            "data": np.concatenate([cached["data"], data]),
+            "indices": np.concatenate([cached["indices"], indices]),
+            "indptr": np.concatenate([cached["indptr"], indptr[1:] + cached["indptr"][-1]]),
+            "labels": np.concatenate([cached["labels"],
+                                      df[self.label_column].values.astype(np.int64)]),
+        }
+        meta = dict(meta, source_size=len(raw), source_sha256=digest,
+                    n_docs=meta["n_docs"] + len(df))
+        started = time.perf_counter()
+        self._save(arrays, terms, meta)
+        self._stage("save_cache", started)
+        logger.info("Corpus cache: appended %s new rows", len(df))
+        return arrays, terms, meta
+
+    def load(self):
+        """
+        Return (counts, labels, terms). counts is a CSR matrix of raw term
+        counts with columns indexed like terms.
+        """
+        self.timings = {}
+        started = time.perf_counter()
+        with open(self.csv_path, "rb") as f:
+            raw = f.read()
+        meta = self._read_meta()
+        prefix_matches = bool(meta) and len(raw) >= meta["source_size"] and \
+            hashlib.sha256(raw[:meta["source_size"]]).hexdigest() == meta["source_sha256"]
+        digest = hashlib.sha256(raw).hexdigest()
+        self._stage("read_hash", started)
+
+        if prefix_matches and len(raw) == meta["source_size"]:
+            started = time.perf_counter()
+            arrays, terms = self._load_arrays()
+            self._stage("load_cache", started)
+            logger.info("Corpus cache hit (%s docs, %s terms)", meta['n_docs'], len(terms))
+        elif prefix_matches and raw[meta["source_size"] - 1:meta["source_size"]] == b"\n":
+            arrays, terms, meta = self._append(raw, digest, meta)
+        else:
+            if self.path:
+                logger.info("Corpus cache miss - tokenizing full corpus")
+            arrays, terms, meta = self._build(raw, digest)
+
+        self.cold_timings = meta.get("cold_timings", {})
+        counts = sp.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=(len(arrays["indptr"]) - 1, len(terms)), copy=False)
+        return counts, np.asarray(arrays["labels"]), terms
+
+
+# ===== VECTORIZER FROM CACHED COUNTS =====
+
+def _doc_count_bound(value, n_docs):
+    return value if isinstance(value, (int, np.integer)) else value * n_docs
+
+
+def fit_vectorizer_from_counts(vectorizer, counts, terms):
+    """
+    Equivalent of vectorizer.fit(texts) given the cached counts of those texts.
+    Returns (fitted vectorizer, tf-idf transformer, selected columns); use
+    transform_counts to get the matching tf-idf matrix for any cached rows.
+    """
+    tfs = np.asarray(counts.sum(axis=0, dtype=np.float64)).ravel()
+
+    # Match CountVectorizer: vocabulary sorted by term, then pruned
+    columns = np.array(sorted(np.flatnonzero(tfs), key=terms.__getitem__), dtype=np.int64)
+    dfs = np.bincount(counts[:, columns].indices, minlength=len(columns))
+    n_docs = counts.shape[0]
+    mask = (dfs <= _doc_count_bound(vectorizer.max_df, n_docs)) & \
+           (dfs >= _doc_count_bound(vectorizer.min_df, n_docs))
+    limit = vectorizer.max_features
+    if limit is not None and mask.sum() > limit:
+        mask_inds = (-tfs[columns][mask]).argsort()[:limit]
+        new_mask = np.zeros(len(columns), dtype=bool)
+        new_mask[np.where(mask)[0][mask_inds]] = True
+        mask = new_mask
+    columns = columns[mask]
+
+    transformer = TfidfTransformer(
+        norm=vectorizer.norm, use_idf=vectorizer.use_idf,
+        smooth_idf=vectorizer.smooth_idf, sublinear_tf=vectorizer.sublinear_tf,
+    ).fit(counts[:, columns].astype(np.float64))
+
+    # Leave what TfidfVectorizer.fit leaves: vocabulary_ and a fitted _tfidf
+    # (set directly, since the idf_ setter is refused when use_idf=False)
+    fitted = clone(vectorizer).set_params(
+        vocabulary={terms[column]: index for index, column in enumerate(columns)})
+    fitted._validate_vocabulary()
+    fitted._tfidf = transformer
+    return fitted, transformer, columns
+
+
+def transform_counts(transformer, counts, columns):
+    """Tf-idf matrix for cached rows - same result as fitted.transform(texts)"""
+    return transformer.transform(counts[:, columns].astype(np.float64))
@@ -0,0 +1,365 @@
+# spam_detection_service/mime_parser.py
+"""
+Streaming MIME text extraction
+Pulls classifiable text out of raw RFC 822 messages without
+loading or decoding the whole message
+"""
+
+import binascii
+import codecs
+import html
+import io
+import os
+import quopri
+import re
+import logging
+from email import policy
+from email.parser import BytesHeaderParser
+
+logger = logging.getLogger(__name__)
+
+# ===== LIMITS =====
+
+# Max bytes of extracted text handed to the preprocessor / model
+MAX_TEXT_BYTES = int(os.getenv('MIME_MAX_TEXT_BYTES', 64 * 1024))
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_LINE_BYTES = 8 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+MAX_NESTED_MESSAGES = 8
+
+_BASE64_INVALID = re.compile(rb'[^A-Za-z0-9+/=]')
+_HTML_DROP_OPEN = re.compile(r'<(script|style|head)\b', re.IGNORECASE)
+_HTML_DROP_CLOSE = {name: re.compile(rf'</{name}\s*>', re.IGNORECASE) for name in ('script', 'style', 'head')}
+
+_header_parser = BytesHeaderParser(policy=policy.default)
+
+
+def strip_html(markup):
+    """
+    Cheap tag stripper - good enough for bag-of-words features.
+    Single forward scan: every search starts where the previous one ended,
+    and an unterminated tag, comment or script/style block drops the rest
+    of the input instead of being searched for again.
+    """
+    out = []
+    pos = 0
+    while True:
+        start = markup.find('<', pos)
+        if start < 0:
+            out.append(markup[pos:])
+            break
+        out.append(markup[pos:start])
+        following = markup[start + 1:start + 2]
+        if not (following.isalpha() or following in ('/', '!', '?')):
+            # A bare '<' in text, not markup
+            out.append('<')
+            pos = start + 1
+            continue
+
+        if markup.startswith('<!--', start):
+            end = markup.find('-->', start + 4)
+            if end < 0:
+                break
+            pos = end + 3
+        else:
+            block = _HTML_DROP_OPEN.match(markup, start)
+            if block:
+                close = _HTML_DROP_CLOSE[block.group(1).lower()].search(markup, block.end())
+                if close is None:
+                    break
+                pos = close.end()
+            else:
+                end = markup.find('>', start + 1)
+                if end < 0:
+                    break
+                pos = end + 1
+        out.append(' ')
+    return ' '.join(html.unescape(''.join(out)).split())
+
+
+def _text_decoder(charset):
+    """
+    Incremental decoder for a declared charset. Only real text encodings are
+    accepted: names like hex, base64 or rot13 resolve to bytes/str transforms
+    in codecs, so they and unknown names fall back to latin-1.
+    """
+    try:
+        if codecs.lookup(charset)._is_text_encoding:
+            return codecs.getincrementaldecoder(charset)(errors="replace")
+    except LookupError:
+        pass
+    return codecs.getincrementaldecoder("latin-1")()
+
+
+class _LineReader:
+    """Chunked reader that can skip to the next '--' line without splitting lines"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = b""
+        self.pos = 0
+        self.bytes_read = 0
+
+    def _fill(self):
+        data = self.stream.read(READ_CHUNK_BYTES)
+        if not data:
+            return False
+        self.bytes_read += len(data)
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def readline(self, limit):
+        while True:
+            end = self.buffer.find(b"\n", self.pos, self.pos + limit)
+            if end >= 0:
+                end += 1
+            elif len(self.buffer) - self.pos >= limit:
+                end = self.pos + limit
+            elif self._fill():
+                continue
+            else:
+                end = len(self.buffer)
+            line = self.buffer[self.pos:end]
+            self.pos = end
+            return line
+
+    def skip_to_dash_line(self):
+        """Discard input up to the next line starting with '--' (call at a line start)"""
+        while len(self.buffer) - self.pos < 2:
+            if not self._fill():
+                return False
+        if self.buffer.startswith(b"--", self.pos):
+            return True
+        while True:
+            found = self.buffer.find(b"\n--", self.pos)
+            if found >= 0:
+                self.pos = found + 1
+                return True
+            # Keep a short tail in case the marker straddles two chunks
+            self.pos = max(self.pos, len(self.buffer) - 2)
+            if not self._fill():
+                self.pos = len(self.buffer)
+                return False
+
+
+class _MimeTextExtractor:
+    """Line-oriented MIME walker; decodes only inline text parts"""
+
+    def __init__(self, stream, max_bytes):
+        self.reader = _LineReader(stream)
+        self.max_bytes = max_bytes
+        self.remaining = max_bytes
+        self.chunks = []
+        self.subject = ""
+        self.boundaries = []  # [boundary, multipart subtype, text already seen]
+        self.parts_decoded = 0
+        self.parts_skipped = 0
+        self.truncated = False
+        self.done = False
+        self.at_line_start = True
+        self._reset_part()
+
+    # ----- reading -----
+
+    def _readline(self):
+        line = self.reader.readline(MAX_LINE_BYTES)
+        starts_line = self.at_line_start
+        self.at_line_start = line.endswith(b"\n")
+        return line, starts_line
+
+    def _read_headers(self):
+        """Read one header block; anything past MAX_HEADER_BYTES is dropped"""
+        block = []
+        size = 0
+        while True:
+            line, _ = self._readline()
+            if not line or line in (b"\r\n", b"\n"):
+                break
+            if size < MAX_HEADER_BYTES:
+                block.append(line)
+                size += len(line)
+        return _header_parser.parsebytes(b"".join(block))
+
+    def _match_boundary(self, line):
+        """Return (index, is_close) for a boundary line, else None"""
+        marker = line.rstrip()
+        for index in range(len(self.boundaries) - 1, -1, -1):
+            delimiter = b"--" + self.boundaries[index][0]
+            if marker == delimiter:
+                return index, False
+            if marker == delimiter + b"--":
+                return index, True
+        return None
+
+    # ----- part handling -----
+
+    def _reset_part(self):
+        self.mode = None  # None (skip), "text" or "html"
+        self.transfer_encoding = ""
+        self.base64_carry = b""
+        self.charset_decoder = None
+        self.html_buffer = []
+        self.html_remaining = 0
+
+    def _begin_part(self, headers, depth=0):
+        self._reset_part()
+        if not self.subject and headers.get("subject"):
+            self.subject = str(headers.get("subject"))
+
+        content_type = headers.get_content_type()
+        maintype = headers.get_content_maintype()
+        disposition = headers.get_content_disposition()
+        encoding = str(headers.get("content-transfer-encoding", "")).strip().lower()
+
+        if maintype == "multipart":
+            boundary = headers.get_param("boundary")
+            if boundary:
+                self.boundaries.append([str(boundary).encode("latin-1", "replace"),
+                                        headers.get_content_subtype(), False])
+            return
+
+        if content_type == "message/rfc822" and depth < MAX_NESTED_MESSAGES \
+                and encoding not in ("base64", "quoted-printable"):
+            self._begin_part(self._read_headers(), depth + 1)
+            return
+
+        if content_type not in ("text/plain", "text/html") or disposition == "attachment":
+            self.parts_skipped += 1
+            return
+
+        parent = self.boundaries[-1] if self.boundaries else None
+        if parent and parent[1] == "alternative" and parent[2]:
+            # Already have a text rendering of this alternative
+            self.parts_skipped += 1
+            return
+        if parent:
+            parent[2] = True
+
+        self.charset_decoder = _text_decoder(headers.get_content_charset() or "utf-8")
+
+        self.transfer_encoding = encoding
+        self.parts_decoded += 1
+        if content_type == "text/html":
+            self.mode = "html"
+            self.html_remaining = self.max_bytes
+        else:
+            self.mode = "text"
+
+    def _transfer_decode(self, line):
+        if self.transfer_encoding == "base64":
+            data = self.base64_carry + _BASE64_INVALID.sub(b"", line)
+            usable = len(data) - len(data) % 4
+            self.base64_carry = data[usable:]
+            try:
+                return binascii.a2b_base64(data[:usable])
+            except binascii.Error:
+                return b""
+        if self.transfer_encoding == "quoted-printable":
+            return quopri.decodestring(line)
+        return line
+
+    def _decode(self, data, final=False):
+        """Charset-decode; a codec that still fails (e.g. idna) falls back to latin-1"""
+        try:
+            return self.charset_decoder.decode(data, final=final)
+        except (ValueError, TypeError):
+            self.charset_decoder = codecs.getincrementaldecoder("latin-1")()
+            return self.charset_decoder.decode(data, final=final)
+
+    def _emit(self, text):
+        if not text or self.remaining <= 0:
+            return
+        if len(text) >= self.remaining:
+            text = text[:self.remaining]
+            self.truncated = True
+            self.done = True
+        self.remaining -= len(text)
+        self.chunks.append(text)
+
+    def _feed(self, line):
+        if self.mode is None:
+            return
+        text = self._decode(self._transfer_decode(line))
+        if self.mode == "text":
+            self._emit(text)
+            return
+        if len(text) >= self.html_remaining:
+            text = text[:self.html_remaining]
+            self.truncated = True
+        self.html_remaining -= len(text)
+        self.html_buffer.append(text)
+        if self.html_remaining <= 0:
+            self._end_part()
+
+    def _end_part(self):
+        if self.mode is None:
+            return
+        tail = b""
+        if self.base64_carry:
+            tail = self._transfer_decode(b"====")
+        text = self._decode(tail, final=True)
+        if self.mode == "html":
+            self.html_buffer.append(text)
+            self._emit(" " + strip_html("".join(self.html_buffer)))
+        else:
+            self._emit(text)
+        self._reset_part()
+
+    # ----- driver -----
+
+    def run(self):
+        self._begin_part(self._read_headers())
+        while not self.done:
+            if self.mode is None and not self.boundaries:
+                # Nothing left that could hold text
+                break
+            if self.mode is None and self.at_line_start:
+                # Skipped part: jump straight to the next boundary candidate
+                if not self.reader.skip_to_dash_line():
+                    break
+            line, starts_line = self._readline()
+            if not line:
+                break
+            if starts_line and self.boundaries and line.startswith(b"--"):
+                match = self._match_boundary(line)
+                if match:
+                    index, is_close = match
+                    self._end_part()
+                    if is_close:
+                        del self.boundaries[index:]
+                    else:
+                        del self.boundaries[index + 1:]
+                        self._begin_part(self._read_headers())
+                    continue
+            self._feed(line)
+        self._end_part()
+
+        text = "".join(self.chunks)
+        if self.subject:
+            text = self.subject + "\n" + text
+        encoded = text.encode("utf-8")
+        if len(encoded) > self.max_bytes:
+            text = encoded[:self.max_bytes].decode("utf-8", errors="ignore")
+            self.truncated = True
+
+        return {
+            "text": text.strip(),
+            "subject": self.subject,
+            "bytes_read": self.reader.bytes_read,
+            "parts_decoded": self.parts_decoded,
+            "parts_skipped": self.parts_skipped,
+            "truncated": self.truncated
+        }
+
+
+def extract_email_text(source, max_bytes=MAX_TEXT_BYTES):
+    """
+    Extract subject + text/plain and text/html content from a raw MIME message.
+    `source` is bytes or a binary stream. Attachment bodies are never decoded
+    and reading stops once max_bytes of text has been collected.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return _MimeTextExtractor(source, max_bytes).run()
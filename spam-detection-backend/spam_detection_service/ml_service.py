@@ -7,11 +7,14 @@ Handles model loading and predictions
 import pickle
 import os
 import logging
-import traceback
+
+from .shadow import ShadowScorer
+from .model_registry import ModelRegistry
 
 logger = logging.getLogger(__name__)
 
 MODEL_PATH = "models/spam_nb.pkl"
+DEFAULT_MODEL_ID = "default"
 
 class MLService:
     """Machine Learning service for spam detection"""
@@ -19,28 +22,32 @@ class MLService:
     def __init__(self):
         """Initialize ML service"""
         self.model = None
+        self.shadow = None
+        self.registry = ModelRegistry.from_env()
         self.load_model()
+        if self.is_loaded():
+            self.shadow = ShadowScorer.from_env(self.model)
     
     def load_model(self):
         """Load trained model safely with debugging"""
         try:
-            logger.info(f"Attempting to load model from: {MODEL_PATH}")
+            logger.info("Attempting to load model from: %s", MODEL_PATH)
             
             # Check if file exists
             if not os.path.exists(MODEL_PATH):
-                logger.warning(f"Model file not found at {MODEL_PATH}")
-                logger.info(f"Current directory: {os.getcwd()}")
-                logger.info(f"Files in current directory: {os.listdir('.')}")
+                logger.warning("Model file not found at %s", MODEL_PATH)
+                logger.info("Current directory: %s", os.getcwd())
+                logger.info("Files in current directory: %s", os.listdir('.'))
                 if os.path.exists('models'):
-                    logger.info(f"Files in models/: {os.listdir('models')}")
+                    logger.info("Files in models/: %s", os.listdir('models'))
                 return False
             
             # Check file size
             file_size = os.path.getsize(MODEL_PATH)
-            logger.info(f"Model file size: {file_size} bytes")
+            logger.info("Model file size: %s bytes", file_size)
             
             if file_size < 100:
-                logger.warning(f"Model file seems too small ({file_size} bytes), might be corrupted")
+                logger.warning("Model file seems too small (%s bytes), might be corrupted", file_size)
                 return False
             
             # Try to load
@@ -50,32 +57,50 @@ class MLService:
                 return True
                 
         except pickle.UnpicklingError as e:
-            logger.error(f"Pickle error - file corrupted: {e}")
-            traceback.print_exc()
+            logger.exception("Pickle error - file corrupted: %s", e)
             return False
         except Exception as e:
-            logger.error(f"Error loading model: {e}")
-            traceback.print_exc()
+            logger.exception("Error loading model: %s", e)
             return False
     
     def is_loaded(self):
         """Check if model is loaded"""
         return self.model is not None
     
-    def predict(self, email_text):
-        """Make prediction on email text"""
-        if not self.is_loaded():
+    def is_known_model(self, model_id):
+        """The default model, or an id the registry can load"""
+        return model_id is None or model_id == DEFAULT_MODEL_ID or self.registry.exists(model_id)
+    
+    def load_selected_model(self, model_id):
+        """
+        Resolve and load a model selected by id (None/"default" = MODEL_PATH).
+        Raises UnknownModel or ModelLoadError; callers do this before the
+        circuit breaker so one tenant's broken model cannot open it for all.
+        """
+        if model_id is None or model_id == DEFAULT_MODEL_ID:
+            return self.model
+        return self.registry.get(model_id)
+    
+    def predict(self, email_text, model_id=None):
+        """Make prediction on email text (model_id selects a registry model)"""
+        if model_id is not None and model_id != DEFAULT_MODEL_ID:
+            model = self.registry.get(model_id)
+        elif not self.is_loaded():
             logger.warning("Model not loaded, returning default prediction")
             return "ham", 0.5
+        else:
+            model = self.model
         
         try:
-            prediction = self.model.predict([email_text])[0]
+            prediction = model.predict([email_text])[0]
             confidence = 0.85
             classification = "spam" if prediction == 1 else "ham"
+            # Shadow candidates are compared against the default model only
+            if self.shadow and model is self.model:
+                self.shadow.submit(email_text, classification)
             return classification, confidence
         except Exception as e:
-            logger.error(f"Prediction error: {e}")
-            traceback.print_exc()
+            logger.exception("Prediction error: %s", e)
             raise
     
     def get_info(self):
@@ -85,6 +110,8 @@ class MLService:
             "version": "1.0",
             "status": "loaded" if self.is_loaded() else "not_loaded",
             "model_path": MODEL_PATH,
+            "shadow_models": list(self.shadow.candidates) if self.shadow else [],
+            "registry_models": self.registry.get_status()["resident_models"],
             "file_exists": os.path.exists(MODEL_PATH),
             "file_size": os.path.getsize(MODEL_PATH) if os.path.exists(MODEL_PATH) else 0
         }
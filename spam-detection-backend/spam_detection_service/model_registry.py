@@ -0,0 +1,278 @@
+# spam_detection_service/model_registry.py
+"""
+Model Registry Module
+Per-tenant / per-language classifiers, loaded lazily on first use and kept
+in a memory-budgeted LRU so many models can share a fixed footprint
+"""
+
+import os
+import re
+import sys
+import time
+import pickle
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ===== REGISTRY CONFIGURATION =====
+# Models are found as <MODEL_REGISTRY_DIR>/<model_id>.pkl, or listed explicitly:
+# MODEL_REGISTRY="acme=models/registry/acme.pkl,de=models/registry/german_nb.pkl"
+
+MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', 'models/registry')
+MODEL_REGISTRY = os.getenv('MODEL_REGISTRY', '')
+MODEL_MEMORY_BUDGET_MB = float(os.getenv('MODEL_MEMORY_BUDGET_MB', 512))
+# Failed loads are not retried for this long, doubling per consecutive failure
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv('MODEL_LOAD_RETRY_SECONDS', 10))
+MODEL_LOAD_MAX_RETRY_SECONDS = float(os.getenv('MODEL_LOAD_MAX_RETRY_SECONDS', 300))
+
+MODEL_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$')
+
+
+class UnknownModel(Exception):
+    """No model is registered under the requested id"""
+
+
+class ModelLoadError(Exception):
+    """The model exists but could not be loaded; retry after `retry_after` seconds"""
+
+    def __init__(self, model_id, retry_after, reason):
+        super().__init__(f"Model {model_id} failed to load: {reason}")
+        self.model_id = model_id
+        self.retry_after = retry_after
+
+
+# ===== MEMORY ESTIMATE =====
+
+def estimate_model_bytes(obj, _seen=None):
+    """
+    Approximate resident size of a fitted model: array buffers, sparse
+    matrices and Python containers reachable from its attributes
+    (e.g. a TfidfVectorizer vocabulary dict)
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, 'indptr') and hasattr(obj, 'data'):  # scipy sparse
+        return sum(estimate_model_bytes(getattr(obj, name), seen) for name in ('data', 'indices', 'indptr'))
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_model_bytes(key, seen) + estimate_model_bytes(value, seen)
+                                        for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_model_bytes(item, seen) for item in obj)
+    if hasattr(obj, '__dict__') and not callable(obj):
+        return sys.getsizeof(obj) + estimate_model_bytes(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+# ===== REGISTRY =====
+
+class _ModelStats:
+    def __init__(self):
+        self.loads = 0
+        self.load_errors = 0
+        self.last_load_ms = None
+        self.total_load_ms = 0.0
+        self.evictions = 0
+        self.hits = 0
+        self.resident_seconds = 0.0
+
+    def to_dict(self):
+        return {
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "last_load_ms": round(self.last_load_ms, 2) if self.last_load_ms is not None else None,
+            "mean_load_ms": round(self.total_load_ms / self.loads, 2) if self.loads else None,
+            "evictions": self.evictions,
+            "hits": self.hits,
+        }
+
+
+class _Resident:
+    def __init__(self, model, size_bytes):
+        self.model = model
+        self.size_bytes = size_bytes
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+
+class _Failure:
+    def __init__(self, failures, reason):
+        self.failures = failures
+        self.reason = reason
+        backoff = min(MODEL_LOAD_RETRY_SECONDS * 2 ** (failures - 1), MODEL_LOAD_MAX_RETRY_SECONDS)
+        self.retry_at = time.time() + backoff
+
+
+class _Loading:
+    """A load in progress; concurrent callers wait on it instead of loading again"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.model = None
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, LRU-evicted set of models keyed by model/tenant id.
+    Loads are single-flight per id and happen outside the registry lock,
+    so a slow load never blocks requests for models that are resident.
+    """
+
+    def __init__(self, models_dir=MODEL_REGISTRY_DIR, paths=None, budget_mb=MODEL_MEMORY_BUDGET_MB):
+        self.models_dir = models_dir
+        self.paths = dict(paths or {})
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.stats = {}
+        self._resident = OrderedDict()  # model id -> _Resident, least recently used first
+        self._loading = {}              # model id -> _Loading
+        self._failures = {}             # model id -> _Failure (negative cache)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        paths = {}
+        for item in MODEL_REGISTRY.split(','):
+            model_id, _, path = item.strip().partition('=')
+            if model_id and path:
+                paths[model_id] = path
+        return cls(paths=paths)
+
+    def resolve_path(self, model_id):
+        """Pickle path for a model id; raises UnknownModel"""
+        if not isinstance(model_id, str) or not MODEL_ID_PATTERN.match(model_id):
+            raise UnknownModel(model_id)
+        path = self.paths.get(model_id) or os.path.join(self.models_dir, f"{model_id}.pkl")
+        if not os.path.exists(path):
+            raise UnknownModel(model_id)
+        return path
+
+    def exists(self, model_id):
+        try:
+            self.resolve_path(model_id)
+            return True
+        except UnknownModel:
+            return False
+
+    def get(self, model_id):
+        """
+        Return the model for model_id, loading it on first use.
+        Raises UnknownModel, or ModelLoadError while a failed load backs off.
+        """
+        with self._lock:
+            resident = self._resident.get(model_id)
+            if resident is not None:
+                self._resident.move_to_end(model_id)
+                resident.last_used = time.time()
+                self.stats[model_id].hits += 1
+                return resident.model
+            failure = self._failures.get(model_id)
+            if failure is not None and time.time() < failure.retry_at:
+                raise ModelLoadError(model_id, round(failure.retry_at - time.time(), 1), failure.reason)
+            loading = self._loading.get(model_id)
+            leader = loading is None
+            if leader:
+                loading = self._loading[model_id] = _Loading()
+
+        if not leader:
+            loading.done.wait()
+            if loading.error is not None:
+                raise loading.error
+            return loading.model
+
+        try:
+            loading.model = self._load(model_id)
+        except Exception as e:
+            loading.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._loading[model_id]
+            loading.done.set()
+        return loading.model
+
+    def _load(self, model_id):
+        path = self.resolve_path(model_id)
+        with self._lock:
+            stats = self.stats.setdefault(model_id, _ModelStats())
+        started = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+        except Exception as e:
+            with self._lock:
+                stats.load_errors += 1
+                previous = self._failures.get(model_id)
+                failure = self._failures[model_id] = _Failure(previous.failures + 1 if previous else 1, str(e))
+            retry_after = round(failure.retry_at - time.time(), 1)
+            logger.error("✗ Failed to load model %s from %s: %s (retry in %ss)", model_id, path, e, retry_after)
+            raise ModelLoadError(model_id, retry_after, str(e)) from e
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        size_bytes = estimate_model_bytes(model)
+
+        with self._lock:
+            stats.loads += 1
+            stats.last_load_ms = elapsed_ms
+            stats.total_load_ms += elapsed_ms
+            self._failures.pop(model_id, None)
+            self._resident[model_id] = _Resident(model, size_bytes)
+            evicted = self._evict_over_budget(keep=model_id)
+
+        logger.info("✓ Model %s loaded in %.1fms (~%.1fMB), evicted: %s", model_id, elapsed_ms,
+                    size_bytes / 1024 / 1024, evicted or "none")
+        if size_bytes > self.budget_bytes:
+            logger.warning("Model %s alone exceeds the %sMB budget", model_id, self.budget_bytes // 1024 // 1024)
+        return model
+
+    def _evict_over_budget(self, keep):
+        """Drop least recently used models until within budget (lock held)"""
+        evicted = []
+        while self.resident_bytes() > self.budget_bytes and len(self._resident) > 1:
+            model_id = next(iter(self._resident))
+            if model_id == keep:
+                break
+            resident = self._resident.pop(model_id)
+            stats = self.stats[model_id]
+            stats.evictions += 1
+            stats.resident_seconds += time.time() - resident.loaded_at
+            evicted.append(model_id)
+        return evicted
+
+    def resident_bytes(self):
+        return sum(resident.size_bytes for resident in self._resident.values())
+
+    def get_status(self):
+        now = time.time()
+        with self._lock:
+            models = {}
+            for model_id, stats in self.stats.items():
+                resident = self._resident.get(model_id)
+                entry = stats.to_dict()
+                entry["resident"] = resident is not None
+                entry["resident_seconds"] = round(
+                    stats.resident_seconds + (now - resident.loaded_at if resident else 0), 1)
+                failure = self._failures.get(model_id)
+                if failure is not None:
+                    entry["last_error"] = failure.reason
+                    entry["retry_in_seconds"] = max(round(failure.retry_at - now, 1), 0)
+                if resident:
+                    entry["size_mb"] = round(resident.size_bytes / 1024 / 1024, 2)
+                    entry["idle_seconds"] = round(now - resident.last_used, 1)
+                models[model_id] = entry
+            return {
+                "budget_mb": round(self.budget_bytes / 1024 / 1024, 1),
+                "resident_mb": round(self.resident_bytes() / 1024 / 1024, 2),
+                "resident_models": len(self._resident),
+                "loading": list(self._loading),
+                "models": models
+            }
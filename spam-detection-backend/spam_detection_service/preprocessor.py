@@ -2,6 +2,18 @@
 import re
 import string
 
+_URL_START = re.compile(r'(?:http|www|ftp)(?=.)', re.DOTALL)
+
+def _strip_token(token: str) -> str:
+    """Drop a URL (from its scheme/www to the end of the token) and email addresses"""
+    url = _URL_START.search(token)
+    if url:
+        token = token[:url.start()]
+    # Same tokens as \S+@\S+: an '@' with at least one character on each side
+    if '@' in token[1:-1]:
+        return ''
+    return token
+
 def preprocess_email(text: str) -> str:
     """
     Clean and normalize email text for ML
@@ -12,11 +24,9 @@ def preprocess_email(text: str) -> str:
     # Convert to lowercase
     text = text.lower()
     
-    # Remove URLs
-    text = re.sub(r'http\S+|www\S+|ftp\S+', '', text)
-    
-    # Remove email addresses
-    text = re.sub(r'\S+@\S+', '', text)
+    # Remove URLs and email addresses, token by token (a regex like \S+@\S+
+    # backtracks quadratically over long runs without whitespace)
+    text = ' '.join(_strip_token(token) for token in text.split())
     
     # Remove special characters (keep spaces)
     text = re.sub(f'[{re.escape(string.punctuation)}0-9]', ' ', text)
@@ -0,0 +1,137 @@
+# spam_detection_service/profiling.py
+"""
+On-demand profiling utilities
+- Sampling profiler across all threads (collapsed stacks for flamegraphs)
+- Opt-in cProfile capture of a single request via the X-Profile header (admin only)
+Both are disabled unless PROFILING_ENABLED is set; when disabled the
+request decorator returns the view unchanged.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+import logging
+from collections import Counter, OrderedDict
+from functools import wraps
+
+from flask import request, make_response
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+from .auth import is_admin
+
+logger = logging.getLogger(__name__)
+
+# ===== PROFILING CONFIGURATION =====
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILE_HEADER = 'X-Profile'
+MAX_SAMPLE_SECONDS = 60
+MIN_INTERVAL_MS = 1
+STORED_PROFILES = 20
+
+_sampler_lock = threading.Lock()
+_request_profile_lock = threading.Lock()
+_profiles_lock = threading.Lock()
+_profiles = OrderedDict()  # profile id -> pstats text
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def sample_stacks(seconds, interval_ms=5):
+    """
+    Sample every thread's stack for `seconds`. Returns a Counter of
+    collapsed stacks ("thread;outer;...;inner" -> samples), or None if
+    another sampling session is already running.
+    """
+    seconds = min(max(seconds, 0.1), MAX_SAMPLE_SECONDS)
+    interval = max(interval_ms, MIN_INTERVAL_MS) / 1000
+    if not _sampler_lock.acquire(blocking=False):
+        return None
+    try:
+        own_ident = threading.get_ident()
+        stacks = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                thread_name = names.get(ident, str(ident))
+                stacks[f"{thread_name};{_collapse(frame)}"] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _sampler_lock.release()
+
+
+def format_collapsed(stacks):
+    """Brendan Gregg collapsed format, ready for flamegraph.pl / speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# ===== PER-REQUEST PROFILES =====
+
+def _store_profile(profile_text):
+    profile_id = uuid.uuid4().hex[:12]
+    with _profiles_lock:
+        _profiles[profile_id] = profile_text
+        while len(_profiles) > STORED_PROFILES:
+            _profiles.popitem(last=False)
+    return profile_id
+
+
+def get_profile(profile_id):
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def profile_request(view):
+    """
+    Capture a cProfile of the wrapped view when an admin's request carries
+    `X-Profile: 1`. The report is kept in memory and its id returned in the
+    X-Profile-Id response header. Other callers' headers are ignored.
+    """
+    if not PROFILING_ENABLED:
+        return view
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.headers.get(PROFILE_HEADER) not in ('1', 'true'):
+            return view(*args, **kwargs)
+        verify_jwt_in_request(optional=True)
+        if not is_admin(get_jwt_identity()):
+            return view(*args, **kwargs)
+
+        # One request profile at a time; concurrent asks run unprofiled
+        if not _request_profile_lock.acquire(blocking=False):
+            return view(*args, **kwargs)
+        try:
+            profiler = cProfile.Profile()
+            response = make_response(profiler.runcall(view, *args, **kwargs))
+        finally:
+            _request_profile_lock.release()
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(40)
+        profile_id = _store_profile(out.getvalue())
+        response.headers['X-Profile-Id'] = profile_id
+        logger.info("Captured request profile %s for %s", profile_id, request.path)
+        return response
+
+    return wrapper
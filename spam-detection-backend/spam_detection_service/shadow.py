@@ -0,0 +1,239 @@
+# spam_detection_service/shadow.py
+"""
+Shadow Scoring Module
+Copies a sample of live predictions to candidate models off the hot path
+"""
+
+import multiprocessing
+import os
+import pickle
+import queue
+import random
+import threading
+import time
+import logging
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ===== SHADOW CONFIGURATION =====
+# SHADOW_MODELS="cnb=models/candidates/complement_nb.pkl,sgd=models/candidates/sgd_linear.pkl"
+
+SHADOW_MODELS = os.getenv('SHADOW_MODELS', '')
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', 0.1))
+SHADOW_QUEUE_SIZE = int(os.getenv('SHADOW_QUEUE_SIZE', 256))
+SHADOW_WORKERS = int(os.getenv('SHADOW_WORKERS', 1))
+SHADOW_NICE = int(os.getenv('SHADOW_NICE', 19))
+
+LATENCY_WINDOW = 1000
+
+
+def spam_probability(model, email_text):
+    """P(spam) when the model exposes probabilities, else the hard label"""
+    if hasattr(model, "predict_proba"):
+        classes = list(model.classes_)
+        if 1 in classes:
+            return float(model.predict_proba([email_text])[0][classes.index(1)])
+    return float(model.predict([email_text])[0] == 1)
+
+
+class _ModelStats:
+    def __init__(self):
+        self.scored = 0
+        self.agreed = 0
+        self.errors = 0
+        self.confidence_delta_sum = 0.0
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def to_dict(self):
+        latencies = list(self.latencies_ms)
+        return {
+            "scored": self.scored,
+            "errors": self.errors,
+            "agreement_rate": round(self.agreed / self.scored, 4) if self.scored else None,
+            "mean_abs_confidence_delta": round(self.confidence_delta_sum / self.scored, 4) if self.scored else None,
+            "latency_p50_ms": round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+            "latency_p99_ms": round(float(np.percentile(latencies, 99)), 3) if latencies else None,
+        }
+
+
+def _load(model):
+    if isinstance(model, str):
+        with open(model, 'rb') as f:
+            return pickle.load(f)
+    return model
+
+
+def _shadow_worker(models, tasks, results, nice):
+    """Worker process: score queued samples with every candidate"""
+    # Lose every CPU contention against the request path
+    if hasattr(os, 'SCHED_IDLE'):
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    elif nice and hasattr(os, 'nice'):
+        os.nice(nice)
+    # Models arrive pickled so that importing/loading them also runs at low priority
+    primary, candidates = pickle.loads(models)
+    primary = _load(primary)
+    candidates = {name: _load(model) for name, model in candidates.items()}
+    results.put("ready")
+    for email_text, classification in iter(tasks.get, None):
+        primary_spam = spam_probability(primary, email_text)
+        scores = []
+        for name, model in candidates.items():
+            try:
+                started = time.perf_counter()
+                candidate_spam = spam_probability(model, email_text)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            except Exception as e:
+                scores.append((name, None, None, None, str(e)))
+                continue
+            agreed = ("spam" if candidate_spam >= 0.5 else "ham") == classification
+            scores.append((name, agreed, abs(candidate_spam - primary_spam), elapsed_ms, None))
+        results.put(scores)
+
+
+class ShadowScorer:
+    """
+    Bounded queue feeding a separate pool of (niced) worker processes.
+    submit() never blocks: when the queue is full the sample is dropped.
+    Candidates are models or pickle paths; paths are only loaded in the workers.
+    Workers start on the first sampled submit (or start()), never at import:
+    spawn children re-import the main module, and a module-level service
+    that started processes there would fail while they bootstrap.
+    """
+
+    def __init__(self, primary, candidates, sample_rate=SHADOW_SAMPLE_RATE,
+                 queue_size=SHADOW_QUEUE_SIZE, workers=SHADOW_WORKERS, nice=SHADOW_NICE):
+        self.candidates = list(candidates)
+        self.sample_rate = sample_rate
+        self.queue_size = queue_size
+        self.sampled = 0
+        self.dropped = 0
+        self.stats = {name: _ModelStats() for name in candidates}
+        self.workers_ready = 0
+        self.workers_alive = 0
+        self.start_error = None
+        self._models = pickle.dumps((primary, dict(candidates)))
+        self._worker_count = workers
+        self._nice = nice
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self.queue = None
+        self._results = None
+        self._workers = []
+
+    def start(self):
+        """Start the worker processes and collector once; False if they cannot run"""
+        with self._start_lock:
+            if self._started:
+                return self.start_error is None
+            self._started = True
+            try:
+                ctx = multiprocessing.get_context('spawn')
+                self.queue = ctx.Queue(maxsize=self.queue_size)
+                self._results = ctx.Queue()
+                for i in range(self._worker_count):
+                    worker = ctx.Process(target=_shadow_worker, name=f"shadow-{i}", daemon=True,
+                                         args=(self._models, self.queue, self._results, self._nice))
+                    worker.start()
+                    self._workers.append(worker)
+            except Exception as e:
+                self.start_error = str(e)
+                logger.error("✗ Shadow workers failed to start: %s", e)
+                return False
+            self.workers_alive = len(self._workers)
+            threading.Thread(target=self._collect, name="shadow-collector", daemon=True).start()
+            return True
+
+    @classmethod
+    def from_env(cls, primary):
+        """Build from SHADOW_MODELS; returns None when shadow mode is off"""
+        if not SHADOW_MODELS or SHADOW_SAMPLE_RATE <= 0:
+            return None
+        candidates = {}
+        for item in SHADOW_MODELS.split(','):
+            name, _, path = item.strip().partition('=')
+            if not os.path.exists(path):
+                logger.error("✗ Shadow model %s not found at %s", name, path)
+                continue
+            candidates[name] = path
+        if not candidates:
+            return None
+        logger.info("✓ Shadow scoring %s at sample rate %s", list(candidates), SHADOW_SAMPLE_RATE)
+        return cls(primary, candidates)
+
+    def submit(self, email_text, classification):
+        """Hot path: sample and enqueue without blocking"""
+        if random.random() >= self.sample_rate:
+            return False
+        if not self._started and not self.start():
+            return False
+        if not self.workers_alive:
+            # Every worker died; do not let samples pile up unscored
+            self.dropped += 1
+            return False
+        try:
+            self.queue.put_nowait((email_text, classification))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.sampled += 1
+        return True
+
+    def _collect(self):
+        while not self._closed:
+            try:
+                scores = self._results.get(timeout=1)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if scores == "ready":
+                self.workers_ready += 1
+                continue
+            with self._lock:
+                for name, agreed, delta, elapsed_ms, error in scores:
+                    stats = self.stats[name]
+                    if error:
+                        stats.errors += 1
+                        continue
+                    stats.scored += 1
+                    stats.agreed += agreed
+                    stats.confidence_delta_sum += delta
+                    stats.latencies_ms.append(elapsed_ms)
+
+    def _check_workers(self):
+        alive = sum(worker.is_alive() for worker in self._workers)
+        if alive < self.workers_alive:
+            dead = [f"{worker.name} (exit {worker.exitcode})" for worker in self._workers if not worker.is_alive()]
+            logger.error("✗ Shadow workers died: %s", ", ".join(dead))
+        self.workers_alive = alive
+
+    def close(self):
+        """Stop the worker processes (pending samples are discarded)"""
+        self._closed = True
+        for worker in self._workers:
+            worker.terminate()
+
+    def get_status(self):
+        with self._lock:
+            models = {name: stats.to_dict() for name, stats in self.stats.items()}
+            scored = sum(stats.scored + stats.errors for stats in self.stats.values())
+        return {
+            "sample_rate": self.sample_rate,
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "pending": self.sampled - scored // max(len(self.stats), 1),
+            "queue_size": self.queue_size,
+            "started": self._started,
+            "start_error": self.start_error,
+            "workers": self._worker_count,
+            "workers_ready": self.workers_ready,
+            "workers_alive": self.workers_alive,
+            "dead_workers": {worker.name: worker.exitcode for worker in self._workers
+                             if worker.exitcode is not None},
+            "models": models
+        }
@@ -73,6 +73,89 @@ def test_services():
         logger.info(f"Report: {json.dumps(report, indent=2)}")
     except Exception as e:
         logger.error(f"Report fetch failed: {e}")
+    
+    # Endpoints below require a JWT
+    headers = {}
+    try:
+        response = requests.post(
+            "http://localhost:5000/auth/login",
+            json={"username": "admin", "password": "spam-detection-2025"},
+            timeout=5
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    except Exception as e:
+        logger.error(f"Login failed: {e}")
+    
+    # Test 5: Raw MIME prediction
+    logger.info("\n=== Testing Raw MIME Prediction ===")
+    raw_email = (
+        b"Subject: You won!\r\n"
+        b"Content-Type: multipart/mixed; boundary=XYZ\r\n\r\n"
+        b"--XYZ\r\nContent-Type: text/plain\r\n\r\nClick here to win free money now!\r\n"
+        b"--XYZ\r\nContent-Type: application/pdf\r\nContent-Disposition: attachment\r\n"
+        b"Content-Transfer-Encoding: base64\r\n\r\nJVBERi0xLjQK\r\n--XYZ--\r\n"
+    )
+    try:
+        response = requests.post("http://localhost:5000/api/ml/predict-raw", data=raw_email,
+                                 headers=dict(headers, **{"Content-Type": "message/rfc822"}), timeout=10)
+        result = response.json()
+        match = "✓" if response.status_code == 200 and result.get("parts_skipped") == 1 else "✗"
+        logger.info(f"{match} Raw prediction: {result}")
+    except Exception as e:
+        logger.error(f"Raw prediction failed: {e}")
+    
+    # Test 6: Report revalidation with ETag
+    logger.info("\n=== Testing Report ETag ===")
+    try:
+        response = requests.get("http://localhost:5001/api/reports/daily", timeout=5)
+        etag = response.headers.get("ETag")
+        response = requests.get("http://localhost:5001/api/reports/daily",
+                                headers={"If-None-Match": etag}, timeout=5)
+        match = "✓" if etag and response.status_code == 304 else "✗"
+        logger.info(f"{match} Revalidation with {etag} → {response.status_code}")
+    except Exception as e:
+        logger.error(f"Report ETag check failed: {e}")
+    
+    # Test 7: Live report stream
+    logger.info("\n=== Testing Report Stream ===")
+    try:
+        with requests.get("http://localhost:5001/api/reports/stream", stream=True, timeout=5) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("data:"):
+                    logger.info(f"✓ First stream event: {line[:100]}")
+                    break
+    except Exception as e:
+        logger.error(f"Report stream failed: {e}")
+    
+    # Test 8: Shadow scoring status
+    logger.info("\n=== Testing Shadow Status ===")
+    try:
+        response = requests.get("http://localhost:5000/api/ml/shadow-status", headers=headers, timeout=5)
+        logger.info(f"Shadow: {response.json()}")
+    except Exception as e:
+        logger.error(f"Shadow status failed: {e}")
+    
+    # Test 9: Profiling endpoints (404 unless PROFILING_ENABLED)
+    logger.info("\n=== Testing Admin Profiling ===")
+    try:
+        response = requests.post("http://localhost:5000/api/admin/profile?seconds=0.5",
+                                 headers=headers, timeout=10)
+        logger.info(f"Sampling profile: HTTP {response.status_code}")
+    except Exception as e:
+        logger.error(f"Profiling check failed: {e}")
+    
+    # Test 10: Model registry and selector
+    logger.info("\n=== Testing Model Registry ===")
+    try:
+        response = requests.get("http://localhost:5000/api/ml/models", headers=headers, timeout=5)
+        logger.info(f"Registry: {response.json()}")
+        for model in ("no-such-model", 123):
+            response = requests.post("http://localhost:5000/api/ml/predict", headers=headers,
+                                     json={"email_text": "hello", "model": model}, timeout=10)
+            match = "✓" if response.status_code == 404 else "✗"
+            logger.info(f"{match} Unknown model {model!r} → {response.status_code}")
+    except Exception as e:
+        logger.error(f"Model registry check failed: {e}")
 
 if __name__ == "__main__":
     test_services()
@@ -0,0 +1,62 @@
+# backend/test_corpus_cache.py
+"""
+The cached training path must match TfidfVectorizer.fit exactly
+Run: python -m pytest test_corpus_cache.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from spam_detection_service.corpus_cache import CorpusCache, fit_vectorizer_from_counts, transform_counts
+
+TEXTS = [
+    "Click here to win free money now",
+    "Hello how are you doing today",
+    "Congratulations you have won 1000 dollars",
+    "Meeting scheduled at 3pm tomorrow",
+    "Free prize claim now click the link",
+    "Project report due tomorrow, thanks team",
+    "Win win win a free cruise today",
+    "Lunch tomorrow? The usual place",
+    "URGENT verify your bank account now",
+    "Please review the attached invoice and schedule",
+]
+
+CONFIGS = [
+    {},
+    {"max_features": 10, "stop_words": "english"},
+    {"min_df": 2},
+    {"max_df": 0.2},
+    {"min_df": 0.1, "max_df": 3},
+    {"ngram_range": (1, 2)},
+    {"ngram_range": (1, 2), "max_features": 15},
+    {"sublinear_tf": True, "norm": "l1"},
+    {"use_idf": False},
+    {"use_idf": False, "norm": None},
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "training.csv"
+    pd.DataFrame({"text": TEXTS, "label": [1, 0] * 5}).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("params", CONFIGS, ids=lambda params: str(params) or "defaults")
+def test_cached_fit_matches_tfidf_vectorizer(params, csv_path, tmp_path):
+    vectorizer = TfidfVectorizer(**params)
+    expected = vectorizer.fit_transform(TEXTS)
+
+    # Cold build, then a cache hit
+    for _ in range(2):
+        counts, labels, terms = CorpusCache(csv_path, TfidfVectorizer(**params),
+                                            cache_dir=str(tmp_path / "cache")).load()
+        fitted, transformer, columns = fit_vectorizer_from_counts(TfidfVectorizer(**params), counts, terms)
+
+        assert fitted.vocabulary_ == vectorizer.vocabulary_
+        np.testing.assert_allclose(transform_counts(transformer, counts, columns).toarray(), expected.toarray())
+        np.testing.assert_allclose(fitted.transform(TEXTS).toarray(), expected.toarray())
+        if vectorizer.use_idf:
+            np.testing.assert_allclose(fitted.idf_, vectorizer.idf_)
@@ -0,0 +1,139 @@
+# backend/test_mime_parser.py
+"""
+Byte-fixture tests for the streaming MIME extractor and the preprocessor
+Run: python -m pytest test_mime_parser.py
+"""
+import base64
+import time
+
+from spam_detection_service.mime_parser import extract_email_text, strip_html
+from spam_detection_service.preprocessor import preprocess_email
+
+# Generous wall-clock bound for inputs that used to take seconds to minutes
+FAST_SECONDS = 1.0
+
+
+def message(headers, body):
+    return ("\r\n".join(headers) + "\r\n\r\n").encode() + body
+
+
+def test_plain_text_and_subject():
+    result = extract_email_text(message(["Subject: Win now", "Content-Type: text/plain"], b"Claim your prize\r\n"))
+    assert result["subject"] == "Win now"
+    assert result["text"] == "Win now\nClaim your prize"
+    assert result["parts_decoded"] == 1
+    assert not result["truncated"]
+
+
+def test_attachment_is_skipped_including_dash_lines():
+    attachment = b"\r\n".join([b"--not-the-boundary", b"QUJDRA=="] * 1000)
+    raw = message(["Content-Type: multipart/mixed; boundary=XYZ"], b"\r\n".join([
+        b"--XYZ",
+        b"Content-Type: application/octet-stream",
+        b"Content-Disposition: attachment; filename=a.bin",
+        b"Content-Transfer-Encoding: base64",
+        b"",
+        attachment,
+        b"--XYZ",
+        b"Content-Type: text/plain",
+        b"",
+        b"after the attachment",
+        b"--XYZ--",
+        b"",
+    ]))
+    result = extract_email_text(raw)
+    assert result["text"] == "after the attachment"
+    assert result["parts_skipped"] == 1
+    assert result["parts_decoded"] == 1
+
+
+def test_base64_carried_across_lines():
+    encoded = base64.b64encode("Free money for everyone, click now!".encode())
+    # Line lengths that are not multiples of 4
+    lines = [encoded[i:i + 7] for i in range(0, len(encoded), 7)]
+    raw = message(["Content-Type: text/plain; charset=utf-8", "Content-Transfer-Encoding: base64"],
+                  b"\r\n".join(lines) + b"\r\n")
+    assert extract_email_text(raw)["text"] == "Free money for everyone, click now!"
+
+
+def test_quoted_printable_soft_breaks():
+    raw = message(["Content-Type: text/plain", "Content-Transfer-Encoding: quoted-printable"],
+                  b"Limited off=\r\ner, price =3D 0 =E2=82=AC\r\n")
+    assert extract_email_text(raw)["text"] == "Limited offer, price = 0 €"
+
+
+def test_nested_rfc822_message():
+    inner = message(["Subject: Inner", "Content-Type: text/plain"], b"forwarded body\r\n")
+    raw = message(["Subject: Outer", "Content-Type: multipart/mixed; boundary=B1"], b"\r\n".join([
+        b"--B1",
+        b"Content-Type: message/rfc822",
+        b"",
+        inner,
+        b"--B1--",
+        b"",
+    ]))
+    result = extract_email_text(raw)
+    assert result["subject"] == "Outer"
+    assert "forwarded body" in result["text"]
+
+
+def test_alternative_keeps_first_rendering_only():
+    raw = message(["Content-Type: multipart/alternative; boundary=ALT"], b"\r\n".join([
+        b"--ALT",
+        b"Content-Type: text/plain",
+        b"",
+        b"plain version",
+        b"--ALT",
+        b"Content-Type: text/html",
+        b"",
+        b"<p>html version</p>",
+        b"--ALT--",
+        b"",
+    ]))
+    result = extract_email_text(raw)
+    assert result["text"] == "plain version"
+    assert result["parts_decoded"] == 1
+    assert result["parts_skipped"] == 1
+
+
+def test_text_cap_stops_reading():
+    body = b"spam " * 200000 + b"\r\n"
+    result = extract_email_text(message(["Content-Type: text/plain"], body), max_bytes=1024)
+    assert result["truncated"]
+    assert len(result["text"].encode()) <= 1024
+    assert result["bytes_read"] < len(body)
+
+
+def test_html_is_stripped():
+    markup = ("<html><head><title>t</title></head><body><!-- hidden --><p>Hi &amp; bye</p>"
+              "<SCRIPT>evil()</script >1 < 2<br/>ok</body></html>")
+    assert strip_html(markup) == "Hi & bye 1 < 2 ok"
+
+
+def test_unclosed_html_constructs_are_linear():
+    for markup in ("<script " * 30000, "<!--" * 32000, "<a" * 30000, "< " * 50000):
+        raw = message(["Content-Type: text/html"], markup.encode() + b"\r\n")
+        started = time.perf_counter()
+        extract_email_text(raw)
+        assert time.perf_counter() - started < FAST_SECONDS
+
+
+def test_preprocess_email_strips_urls_and_addresses():
+    assert preprocess_email("Visit http://x.io/a or mail me@x.io NOW!") == "visit or mail now"
+
+
+def test_preprocess_email_is_linear_on_long_tokens():
+    for text in ("a" * 65536, "a." * 32768, "h" * 65536, "@" + "a" * 65535):
+        started = time.perf_counter()
+        preprocess_email(text)
+        assert time.perf_counter() - started < FAST_SECONDS
+
+
+def test_non_text_and_failing_charsets_fall_back():
+    body = b"caf\xe9 win \xff\xfe prize\r\n"
+    for charset in ("hex", "base64", "zlib", "uu", "rot13", "idna", "no-such-charset"):
+        result = extract_email_text(message([f"Content-Type: text/plain; charset={charset}"], body))
+        assert result["text"] == body.rstrip().decode("latin-1")
+    # A text codec that is valid but wrong for the bytes still yields text
+    result = extract_email_text(message(["Content-Type: text/plain; charset=utf-16"], body))
+    assert result["parts_decoded"] == 1